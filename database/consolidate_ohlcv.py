@@ -56,17 +56,58 @@ class OHLCVConsolidator:
                 )
             """)
             
-            # Create index on timestamp and token_name
+            self.conn.commit()
+            
+            # Unique key on (token_name, timestamp) backs the upsert in import_csv_file
+            self._ensure_unique_key()
+            logger.info("Created tables and indices")
+            
+        except Exception as e:
+            logger.error(f"Error creating tables: {str(e)}")
+            raise
+    
+    def _ensure_unique_key(self):
+        """Create the unique (token_name, timestamp) index, compacting legacy duplicates first if needed"""
+        try:
             self.cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_ohlcv_token_time 
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_ohlcv_token_time_unique
                 ON ohlcv(token_name, timestamp)
             """)
+        except sqlite3.IntegrityError:
+            logger.warning("Existing duplicate bars prevent the unique key, compacting first")
+            self.compact()
+            return
+        
+        # The unique index covers the same lookups as the old non-unique one
+        self.cursor.execute("DROP INDEX IF EXISTS idx_ohlcv_token_time")
+        self.conn.commit()
+    
+    def compact(self):
+        """Remove duplicate bars left by earlier append-only imports, keeping the latest row"""
+        try:
+            self.cursor.execute("SELECT COUNT(*) FROM ohlcv")
+            before = self.cursor.fetchone()[0]
             
+            self.cursor.execute("""
+                DELETE FROM ohlcv
+                WHERE id NOT IN (
+                    SELECT MAX(id)
+                    FROM ohlcv
+                    GROUP BY token_name, timestamp
+                )
+            """)
+            removed = self.cursor.rowcount
             self.conn.commit()
-            logger.info("Created tables and indices")
+            logger.info(f"Removed {removed} duplicate rows out of {before}")
+            
+            self._ensure_unique_key()
+            
+            # Reclaim the space freed by the deleted rows
+            self.cursor.execute("VACUUM")
+            return removed
             
         except Exception as e:
-            logger.error(f"Error creating tables: {str(e)}")
+            logger.error(f"Error compacting database: {str(e)}")
             raise
     
     def get_token_name(self, file_path):
@@ -119,13 +160,57 @@ class OHLCVConsolidator:
             if 'volume' not in df.columns:
                 df['volume'] = 0
             
+            # Rows without a timestamp cannot be keyed, so they are skipped
+            df = df.dropna(subset=['timestamp'])
+            
             # Insert into database
-            df.to_sql('ohlcv', self.conn, if_exists='append', index=False)
-            logger.info(f"Imported {len(df)} rows for {token_name}")
+            self.upsert_bars(df)
+            logger.info(f"Upserted {len(df)} rows for {token_name}")
             
         except Exception as e:
+            self.conn.rollback()
             logger.error(f"Error importing {file_path}: {str(e)}")
     
+    def upsert_bars(self, df):
+        """Bulk upsert bars through a temp staging table keyed on (token_name, timestamp)"""
+        columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'token_name', 'source_file']
+        
+        # Store timestamps the same way to_sql did so keys match rows from earlier imports
+        timestamps = [ts.isoformat(' ') for ts in df['timestamp']]
+        rows = zip(timestamps, *(df[col].tolist() for col in columns[1:]))
+        
+        self.cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS ohlcv_staging (
+                timestamp DATETIME,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume REAL,
+                token_name TEXT,
+                source_file TEXT
+            )
+        """)
+        self.cursor.execute("DELETE FROM temp.ohlcv_staging")
+        self.cursor.executemany(
+            "INSERT INTO temp.ohlcv_staging VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        
+        # WHERE true keeps SQLite from parsing ON CONFLICT as part of the SELECT
+        self.cursor.execute(f"""
+            INSERT INTO ohlcv ({', '.join(columns)})
+            SELECT {', '.join(columns)} FROM temp.ohlcv_staging WHERE true
+            ON CONFLICT(token_name, timestamp) DO UPDATE SET
+                open = excluded.open,
+                high = excluded.high,
+                low = excluded.low,
+                close = excluded.close,
+                volume = excluded.volume,
+                source_file = excluded.source_file
+        """)
+        self.cursor.execute("DELETE FROM temp.ohlcv_staging")
+        self.conn.commit()
+    
     def process_directory(self, directory):
         """Process all CSV files in a directory"""
         try:
@@ -141,6 +226,7 @@ class OHLCVConsolidator:
 
 def main():
     """Main function to consolidate OHLCV data"""
+    import sys
     consolidator = OHLCVConsolidator()
     
     try:
@@ -148,6 +234,11 @@ def main():
         consolidator.connect()
         consolidator.create_tables()
         
+        # `python consolidate_ohlcv.py compact` only removes duplicates from an existing database
+        if len(sys.argv) > 1 and sys.argv[1] == "compact":
+            consolidator.compact()
+            return
+        
         # Process ohlcv_data directory
         ohlcv_dir = 'ohlcv_data'
         logger.info(f"Processing directory: {ohlcv_dir}")
@@ -0,0 +1,93 @@
+import sys
+import time
+import resource
+import multiprocessing as mp
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from memequant_gan import Discriminator, PooledDiscriminator
+
+SEQUENCE_LENGTHS = [100, 500, 2000]
+VARIANTS = ['dense', 'attention', 'meanmax']
+
+
+def build_discriminator(variant, sequence_length):
+    if variant == 'dense':
+        return Discriminator(sequence_length)
+    return PooledDiscriminator(sequence_length, pooling=variant)
+
+
+def run_config(variant, sequence_length, batch_size, steps, threads, queue):
+    """Time discriminator steps in a fresh process so peak RSS belongs to this config only"""
+    try:
+        torch.set_num_threads(threads)
+        torch.manual_seed(0)
+        model = build_discriminator(variant, sequence_length)
+        params = sum(p.numel() for p in model.parameters())
+        optimizer = optim.Adam(model.parameters(), lr=0.0002, betas=(0.5, 0.999))
+        criterion = nn.BCELoss()
+
+        real = torch.rand(batch_size, sequence_length, 5)
+        fake = torch.rand(batch_size, sequence_length, 5)
+        real_label = torch.ones(batch_size, 1)
+        fake_label = torch.zeros(batch_size, 1)
+
+        def step():
+            # Same work as the discriminator half of MemeQuantGAN.train_step
+            optimizer.zero_grad()
+            loss = criterion(model(real), real_label) + criterion(model(fake), fake_label)
+            loss.backward()
+            optimizer.step()
+
+        step()  # warm-up
+        start = time.perf_counter()
+        for _ in range(steps):
+            step()
+        step_time = (time.perf_counter() - start) / steps
+
+        # ru_maxrss is KiB on Linux
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        queue.put({'params': params, 'step_time': step_time, 'peak_mb': peak_mb})
+    except (RuntimeError, MemoryError) as e:
+        queue.put({'error': str(e).splitlines()[0]})
+
+
+def benchmark(sequence_lengths=SEQUENCE_LENGTHS, variants=VARIANTS, batch_size=16, steps=5, threads=None):
+    threads = threads or torch.get_num_threads()
+    ctx = mp.get_context('spawn')
+    results = []
+
+    for sequence_length in sequence_lengths:
+        for variant in variants:
+            queue = ctx.Queue()
+            proc = ctx.Process(
+                target=run_config,
+                args=(variant, sequence_length, batch_size, steps, threads, queue)
+            )
+            proc.start()
+            proc.join()
+            result = queue.get() if not queue.empty() else {'error': f'process exited with {proc.exitcode}'}
+            result.update({'variant': variant, 'sequence_length': sequence_length})
+            results.append(result)
+            print_row(result)
+
+    return results
+
+
+def print_row(result):
+    label = f"seq_len={result['sequence_length']:<5} {result['variant']:<10}"
+    if 'error' in result:
+        print(f"{label} failed: {result['error']}")
+        return
+    print(
+        f"{label} params={result['params'] / 1e6:8.2f}M "
+        f"step={result['step_time'] * 1000:9.1f} ms "
+        f"peak_rss={result['peak_mb']:8.0f} MB"
+    )
+
+
+if __name__ == "__main__":
+    # Usage: python benchmark_discriminator.py [seq_len ...]
+    lengths = [int(arg) for arg in sys.argv[1:]] or SEQUENCE_LENGTHS
+    print(f"Discriminator step benchmark (batch_size=16, {torch.get_num_threads()} threads)")
+    benchmark(sequence_lengths=lengths)
@@ -0,0 +1,88 @@
+import sys
+import time
+import torch
+from torch.profiler import profile, ProfilerActivity
+from memequant_gan import project_ohlc, open_close_extremes
+
+
+def sliced_projection(prices, volumes):
+    """The previous Generator.forward tail: four slices, nested maximum/minimum and a five-way cat"""
+    open_price = prices[:, :, 0:1]
+    high_price = prices[:, :, 1:2]
+    low_price = prices[:, :, 2:3]
+    close_price = prices[:, :, 3:4]
+    high_price = torch.maximum(high_price, torch.maximum(open_price, close_price))
+    low_price = torch.minimum(low_price, torch.minimum(open_price, close_price))
+    return torch.cat([open_price, high_price, low_price, close_price, volumes], dim=2)
+
+
+def sliced_consistency_loss(data):
+    open_price = data[:, :, 0]
+    high_price = data[:, :, 1]
+    low_price = data[:, :, 2]
+    close_price = data[:, :, 3]
+    high_loss = torch.mean(torch.relu(torch.maximum(open_price, close_price) - high_price))
+    low_loss = torch.mean(torch.relu(low_price - torch.minimum(open_price, close_price)))
+    return high_loss + low_loss
+
+
+def fused_consistency_loss(data):
+    upper, lower = open_close_extremes(data)
+    return torch.mean(torch.relu(upper - data[..., 1:2])) + torch.mean(torch.relu(data[..., 2:3] - lower))
+
+
+VARIANTS = {
+    'sliced': (sliced_projection, sliced_consistency_loss),
+    'fused': (project_ohlc, fused_consistency_loss)
+}
+
+
+def run(projection, loss_fn, prices, volumes):
+    """Forward and backward through the projection and consistency loss, as in the generator half of train_step"""
+    out = projection(prices, volumes)
+    (out.mean() + loss_fn(out)).backward()
+
+
+def profile_variant(name, batch_size, sequence_length=100, steps=50):
+    projection, loss_fn = VARIANTS[name]
+    prices = torch.rand(batch_size, sequence_length, 4, requires_grad=True)
+    volumes = torch.rand(batch_size, sequence_length, 1, requires_grad=True)
+
+    for _ in range(5):  # warm-up
+        run(projection, loss_fn, prices, volumes)
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        run(projection, loss_fn, prices, volumes)
+    step_time = (time.perf_counter() - start) / steps
+
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        run(projection, loss_fn, prices, volumes)
+    events = prof.key_averages()
+    # Allocations show up as positive self memory on the op that made them
+    allocations = sum(e.count for e in events if e.self_cpu_memory_usage > 0)
+    allocated_mb = sum(max(e.self_cpu_memory_usage, 0) for e in events) / 2 ** 20
+    ops = sum(e.count for e in events if e.key.startswith('aten::'))
+    return {'step_time': step_time, 'ops': ops, 'allocations': allocations, 'allocated_mb': allocated_mb}
+
+
+def benchmark(batch_sizes=(64, 512, 2048)):
+    results = []
+    for batch_size in batch_sizes:
+        for name in VARIANTS:
+            result = profile_variant(name, batch_size)
+            result.update({'variant': name, 'batch_size': batch_size})
+            results.append(result)
+            print(
+                f"batch={batch_size:<5} {name:<7} step={result['step_time'] * 1000:8.3f} ms "
+                f"aten_ops={result['ops']:4d} allocations={result['allocations']:4d} "
+                f"allocated={result['allocated_mb']:7.2f} MB"
+            )
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python benchmark_ohlc_projection.py [batch_size ...]
+    sizes = [int(arg) for arg in sys.argv[1:]] or (64, 512, 2048)
+    print(f"OHLC projection + consistency loss, forward and backward ({torch.get_num_threads()} threads)")
+    benchmark(sizes)
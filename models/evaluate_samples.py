@@ -0,0 +1,156 @@
+import sys
+import time
+import numpy as np
+
+EPS = 1e-8
+
+
+def _as_array(data):
+    """Accept torch tensors or NumPy arrays of shape (batch, sequence, 5)"""
+    if hasattr(data, 'detach'):
+        data = data.detach().float().cpu().numpy()
+    return np.asarray(data, dtype=np.float64)
+
+
+def log_returns(data):
+    """Close-to-close log returns, shape (batch, sequence - 1)"""
+    close = data[:, :, 3]
+    return np.diff(np.log(np.maximum(close, 0.0) + EPS), axis=1)
+
+
+def acf(x, max_lag):
+    """
+    Autocorrelation of each row for lags 1..max_lag via FFT, averaged over rows
+
+    Zero padding to twice the length gives the linear (not circular)
+    autocovariance, so the whole batch costs one rfft/irfft pair.
+    """
+    x = x - x.mean(axis=1, keepdims=True)
+    n = x.shape[1]
+    size = 1 << (2 * n - 1).bit_length()
+    spectrum = np.fft.rfft(x, n=size, axis=1)
+    autocov = np.fft.irfft(spectrum * np.conj(spectrum), n=size, axis=1)[:, :max_lag + 1]
+    variance = autocov[:, :1]
+    valid = variance[:, 0] > EPS
+    if not valid.any():
+        return np.zeros(max_lag)
+    return (autocov[valid, 1:] / variance[valid]).mean(axis=0)
+
+
+def return_moments(returns):
+    """Mean, std, skewness and excess kurtosis of all returns pooled together"""
+    r = returns.ravel()
+    mean = r.mean()
+    centered = r - mean
+    z2 = centered * centered
+    variance = z2.mean()
+    std = np.sqrt(variance)
+    if std < EPS:
+        return {'mean': mean, 'std': std, 'skew': 0.0, 'kurtosis': 0.0}
+    return {
+        'mean': mean,
+        'std': std,
+        'skew': np.dot(z2, centered) / len(r) / variance ** 1.5,
+        'kurtosis': np.dot(z2, z2) / len(r) / variance ** 2 - 3.0
+    }
+
+
+def leverage_effect(returns, max_lag):
+    """
+    corr(r_t, r_{t+k}^2) for k = 1..max_lag, pooled over the batch
+
+    Real markets show negative values: falling prices raise later volatility.
+    The lagged cross-covariances come from one FFT cross-correlation.
+    """
+    r = returns - returns.mean(axis=1, keepdims=True)
+    sq = returns ** 2
+    sq = sq - sq.mean(axis=1, keepdims=True)
+    denom = r.std() * sq.std()
+    batch, n = returns.shape
+    lags = min(max_lag, n - 1)
+    result = np.zeros(max_lag)
+    if denom < EPS or lags < 1:
+        return result
+
+    size = 1 << (2 * n - 1).bit_length()
+    cross = np.fft.irfft(
+        np.conj(np.fft.rfft(r, n=size, axis=1)) * np.fft.rfft(sq, n=size, axis=1), n=size, axis=1
+    )
+    # cross[:, k] = sum_t r[t] * sq[t + k]; average over the n - k overlapping pairs
+    sums = cross[:, 1:lags + 1].sum(axis=0)
+    result[:lags] = sums / (batch * (n - np.arange(1, lags + 1))) / denom
+    return result
+
+
+def ohlc_violation_rates(data):
+    """Share of bars breaking OHLC consistency rules"""
+    o, h, l, c, v = (data[:, :, i] for i in range(5))
+    rules = {
+        'high_below_open_close': h < np.maximum(o, c) - EPS,
+        'low_above_open_close': l > np.minimum(o, c) + EPS,
+        'low_above_high': l > h + EPS,
+        'negative_volume': v < 0
+    }
+    rates = {name: broken.mean() for name, broken in rules.items()}
+    rates['any'] = np.logical_or.reduce(list(rules.values())).mean()
+    return rates
+
+
+def stylized_facts(data, max_lag=20):
+    """All statistics for one set of samples"""
+    data = _as_array(data)
+    returns = log_returns(data)
+    max_lag = min(max_lag, returns.shape[1] - 1)
+    abs_acf = acf(np.abs(returns), max_lag)
+    return {
+        'moments': return_moments(returns),
+        'acf_returns': acf(returns, max_lag),
+        'acf_abs_returns': abs_acf,
+        # Volatility clustering: how persistent |r| stays across the first lags
+        'volatility_clustering': abs_acf[:min(10, max_lag)].mean() if max_lag else 0.0,
+        'leverage_effect': leverage_effect(returns, max_lag),
+        'ohlc_violations': ohlc_violation_rates(data)
+    }
+
+
+def compare(real, generated, max_lag=20):
+    """
+    Stylized facts for real and generated samples plus distances between them
+
+    real: samples, or the dict returned by stylized_facts so per-epoch calls
+          only pay for the generated side
+    Returns a dict with 'real', 'generated' and a flat 'scores' dict that is
+    cheap enough to log every epoch.
+    """
+    real_facts = real if isinstance(real, dict) else stylized_facts(real, max_lag)
+    fake_facts = stylized_facts(generated, max_lag)
+
+    scores = {}
+    for name in ('std', 'skew', 'kurtosis'):
+        scores[f'{name}_diff'] = abs(fake_facts['moments'][name] - real_facts['moments'][name])
+    for name in ('acf_returns', 'acf_abs_returns', 'leverage_effect'):
+        scores[f'{name}_mse'] = float(np.mean((fake_facts[name] - real_facts[name]) ** 2))
+    scores['volatility_clustering_diff'] = abs(
+        fake_facts['volatility_clustering'] - real_facts['volatility_clustering']
+    )
+    scores['ohlc_violation_rate'] = float(fake_facts['ohlc_violations']['any'])
+
+    return {'real': real_facts, 'generated': fake_facts, 'scores': scores}
+
+
+def main():
+    # Usage: python evaluate_samples.py real.npy generated.npy
+    real = np.load(sys.argv[1], mmap_mode='r')
+    generated = np.load(sys.argv[2], mmap_mode='r')
+
+    start = time.perf_counter()
+    result = compare(real, generated)
+    elapsed = time.perf_counter() - start
+
+    print(f"Evaluated {len(real)} real and {len(generated)} generated samples in {elapsed:.2f}s")
+    for name, value in result['scores'].items():
+        print(f"- {name}: {value:.6f}")
+
+
+if __name__ == "__main__":
+    main()
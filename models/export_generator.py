@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import time
+import subprocess
+import torch
+from memequant_gan import load_generator
+from generator_runtime import METADATA_FILE, ExportedGenerator
+
+
+def _to_list(values):
+    return [float(v) for v in values]
+
+
+def export_generator(generator, path, price_scaler, volume_scaler):
+    """
+    Save the generator as TorchScript with its scaler metadata embedded
+
+    The file is loaded by generator_runtime.ExportedGenerator, which only
+    needs torch and NumPy. Falls back to tracing if scripting fails.
+    """
+    generator = generator.cpu().eval()
+    try:
+        module = torch.jit.script(generator)
+    except Exception:
+        example = (torch.randn(2, generator.latent_dim),)
+        if generator.condition_dim:
+            example += (torch.zeros(2, generator.sequence_length, generator.condition_dim),)
+        module = torch.jit.trace(generator, example)
+
+    metadata = {
+        'latent_dim': generator.latent_dim,
+        'sequence_length': generator.sequence_length,
+        'feature_dim': generator.feature_dim,
+        'condition_dim': generator.condition_dim,
+        'price_scaler': {'min': _to_list(price_scaler['min']), 'max': _to_list(price_scaler['max'])},
+        'volume_scaler': {'min': _to_list(volume_scaler['min']), 'max': _to_list(volume_scaler['max'])}
+    }
+    torch.jit.save(module, path, _extra_files={METADATA_FILE: json.dumps(metadata)})
+    return path
+
+
+def _time_subprocess(code):
+    """Wall time of a fresh interpreter running code, i.e. the cold start a new service sees"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return time.perf_counter() - start
+
+
+def _per_batch_latency(fn, batch_size, repeats):
+    fn(batch_size)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(batch_size)
+    return (time.perf_counter() - start) / repeats
+
+
+def benchmark(checkpoint, exported_path, batch_sizes=(1, 16, 64), repeats=10):
+    """Compare cold start and per-batch latency of the eager MemeQuantGAN and the exported generator"""
+    eager_code = (
+        "import torch; from memequant_gan import load_generator; "
+        f"g = load_generator(torch.load({checkpoint!r}, map_location='cpu')).eval(); "
+        "c = torch.zeros(1, g.sequence_length, g.condition_dim) if g.condition_dim else None; "
+        "torch.no_grad().__enter__(); g(torch.randn(1, g.latent_dim), c)"
+    )
+    exported_code = (
+        "import numpy as np; from generator_runtime import ExportedGenerator; "
+        f"g = ExportedGenerator({exported_path!r}); "
+        "g.generate(1, condition=np.zeros((1, g.sequence_length, g.condition_dim), np.float32) "
+        "if g.condition_dim else None)"
+    )
+    print(f"Cold start (new process to first sample): "
+          f"eager {_time_subprocess(eager_code):.2f}s, exported {_time_subprocess(exported_code):.2f}s")
+
+    eager = load_generator(torch.load(checkpoint, map_location='cpu'))
+    eager.eval()
+    exported = ExportedGenerator(exported_path)
+
+    # Conditional generators are timed with neutral (all-zero) conditioning
+    def condition(n):
+        if not eager.condition_dim:
+            return None
+        return torch.zeros(n, eager.sequence_length, eager.condition_dim)
+
+    def run_eager(n):
+        with torch.inference_mode():
+            eager(torch.randn(n, eager.latent_dim), condition(n)).numpy()
+
+    def run_exported(n):
+        c = condition(n)
+        exported.generate(n, condition=None if c is None else c.numpy())
+
+    for batch_size in batch_sizes:
+        eager_ms = _per_batch_latency(run_eager, batch_size, repeats) * 1000
+        exported_ms = _per_batch_latency(run_exported, batch_size, repeats) * 1000
+        print(f"batch={batch_size:<5} eager {eager_ms:8.2f} ms  exported {exported_ms:8.2f} ms")
+
+
+def joint_scalers(dataset, symbol=None):
+    """One symbol's scalers from a JointFeatureDataset, in MemeTimeseriesDataset's per-column form"""
+    scalers = dataset.scalers[symbol or dataset.symbols[0]]
+    price, volume = scalers['price'], scalers['volume']
+    return ({'min': [price['min']] * 4, 'max': [price['max']] * 4},
+            {'min': [volume['min']], 'max': [volume['max']]})
+
+
+def main():
+    # Usage: python export_generator.py checkpoint.pt data.csv|joint_features.npy output.pt [--symbol=SYM] [--benchmark]
+    import pandas as pd
+    from memequant_gan import MemeTimeseriesDataset
+    from joint_features import JointFeatureDataset
+
+    checkpoint, data_path, output = [arg for arg in sys.argv[1:] if not arg.startswith('--')][:3]
+    generator = load_generator(torch.load(checkpoint, map_location='cpu'))
+
+    # Scalers come from the data the checkpoint was trained on; joint features are
+    # scaled per symbol, so a conditional export carries one symbol's scalers
+    if data_path.endswith('.npy'):
+        symbol = next((arg.split('=', 1)[1] for arg in sys.argv if arg.startswith('--symbol=')), None)
+        dataset = JointFeatureDataset(data_path, sequence_length=generator.sequence_length)
+        price_scaler, volume_scaler = joint_scalers(dataset, symbol)
+    else:
+        dataset = MemeTimeseriesDataset(pd.read_csv(data_path), sequence_length=generator.sequence_length)
+        price_scaler, volume_scaler = dataset.price_scaler, dataset.volume_scaler
+    export_generator(generator, output, price_scaler, volume_scaler)
+    print(f"Exported generator to {output}")
+
+    if '--benchmark' in sys.argv:
+        benchmark(checkpoint, output)
+
+
+if __name__ == "__main__":
+    main()
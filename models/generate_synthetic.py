@@ -0,0 +1,218 @@
+import os
+import sys
+import logging
+import multiprocessing as mp
+import numpy as np
+import torch
+from memequant_gan import Generator, load_generator
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+FEATURES = ['open', 'high', 'low', 'close', 'volume']
+
+
+def inverse_transform(samples, price_scaler, volume_scaler):
+    """Map scaled (batch, sequence, 5) samples back to prices and volumes, in place"""
+    price_range = price_scaler['max'] - price_scaler['min']
+    volume_range = volume_scaler['max'] - volume_scaler['min']
+    samples[:, :, :4] *= price_range.astype(samples.dtype)
+    samples[:, :, :4] += price_scaler['min'].astype(samples.dtype)
+    samples[:, :, 4:] *= volume_range.astype(samples.dtype)
+    samples[:, :, 4:] += volume_scaler['min'].astype(samples.dtype)
+    return samples
+
+
+class ConditionSampler:
+    def __init__(self, dataset, num_samples, seed=0):
+        """
+        Conditioning windows for a conditional generator, drawn from a JointFeatureDataset
+
+        Sample i is conditioned on the sentiment channels of a random window and
+        is mapped back to prices with the scalers of that window's symbol, since
+        joint features are scaled per symbol.
+        """
+        self.dataset = dataset
+        self.indices = np.random.default_rng(seed).integers(len(dataset), size=num_samples)
+        scalers = [dataset.scalers[symbol] for symbol in dataset.symbols]
+        price = np.array([[s['price']['min'], s['price']['max']] for s in scalers])
+        volume = np.array([[s['volume']['min'], s['volume']['max']] for s in scalers])
+        positions = dataset.symbol_of(self.indices)
+        self.price = price[positions].astype(np.float32)
+        self.volume = volume[positions].astype(np.float32)
+
+    def condition(self, start, stop):
+        """(stop - start, sequence_length, condition_dim) tensor for samples [start, stop)"""
+        return self.dataset.get_batch(self.indices[start:stop])[..., len(FEATURES):]
+
+    def scalers(self, start, stop):
+        """Per-sample price and volume scalers for samples [start, stop), shaped to broadcast over a batch"""
+        price, volume = self.price[start:stop, None, None], self.volume[start:stop, None, None]
+        return ({'min': price[..., 0], 'max': price[..., 1]},
+                {'min': volume[..., 0], 'max': volume[..., 1]})
+
+
+def iter_batches(generator, num_samples, batch_size=1024, device='cpu', seed=None, conditions=None, offset=0):
+    """
+    Yield generated samples as float32 NumPy arrays of at most batch_size
+
+    conditions: ConditionSampler, required when the generator is conditional;
+                this call covers its samples [offset, offset + num_samples)
+    """
+    if generator.condition_dim and conditions is None:
+        raise ValueError("A conditional generator needs conditions (see ConditionSampler)")
+    rng = torch.Generator(device=device)
+    if seed is not None:
+        rng.manual_seed(seed)
+
+    generator.eval()
+    with torch.inference_mode():
+        for start in range(0, num_samples, batch_size):
+            n = min(batch_size, num_samples - start)
+            z = torch.randn(n, generator.latent_dim, generator=rng, device=device)
+            condition = None
+            if conditions is not None:
+                condition = conditions.condition(offset + start, offset + start + n).to(device)
+            yield generator(z, condition).cpu().numpy()
+
+
+def _scale_back(batch, row, price_scaler, volume_scaler, conditions):
+    if conditions is not None:
+        price_scaler, volume_scaler = conditions.scalers(row, row + len(batch))
+    return inverse_transform(batch, price_scaler, volume_scaler)
+
+
+def _generate_slice(args):
+    """Worker: fill rows [start, stop) of the shared .npy file"""
+    (state_dict, latent_dim, sequence_length, condition_dim, path, start, stop,
+     batch_size, price_scaler, volume_scaler, conditions, seed, threads) = args
+    torch.set_num_threads(threads)
+    generator = Generator(latent_dim, sequence_length, condition_dim=condition_dim)
+    generator.load_state_dict(state_dict)
+
+    out = np.load(path, mmap_mode='r+')
+    row = start
+    for batch in iter_batches(generator, stop - start, batch_size, seed=seed, conditions=conditions, offset=start):
+        out[row:row + len(batch)] = _scale_back(batch, row, price_scaler, volume_scaler, conditions)
+        row += len(batch)
+    out.flush()
+    return stop - start
+
+
+def write_memmap(generator, path, num_samples, price_scaler, volume_scaler,
+                 batch_size=1024, processes=1, seed=0, conditions=None):
+    """
+    Generate num_samples paths straight into a memory-mapped .npy file
+
+    Only one batch per process is ever held in memory. With processes > 1
+    the rows are split into contiguous slices, each filled by its own
+    worker with its own seed and an even share of the CPU threads.
+    conditions: ConditionSampler for a conditional generator; its per-sample
+                scalers then replace price_scaler and volume_scaler
+    """
+    sequence_length = generator.sequence_length
+    out = np.lib.format.open_memmap(
+        path, mode='w+', dtype=np.float32, shape=(num_samples, sequence_length, len(FEATURES))
+    )
+
+    if processes <= 1:
+        row = 0
+        for batch in iter_batches(generator, num_samples, batch_size, seed=seed, conditions=conditions):
+            out[row:row + len(batch)] = _scale_back(batch, row, price_scaler, volume_scaler, conditions)
+            row += len(batch)
+            if row % (batch_size * 100) < batch_size:
+                logger.info(f"Generated {row}/{num_samples} samples")
+        out.flush()
+        return path
+
+    out.flush()
+    del out
+
+    state_dict = {k: v.cpu() for k, v in generator.state_dict().items()}
+    threads = max(1, torch.get_num_threads() // processes)
+    bounds = np.linspace(0, num_samples, processes + 1).astype(int)
+    tasks = [
+        (state_dict, generator.latent_dim, sequence_length, generator.condition_dim, path,
+         int(bounds[i]), int(bounds[i + 1]), batch_size, price_scaler, volume_scaler, conditions, seed + i, threads)
+        for i in range(processes) if bounds[i + 1] > bounds[i]
+    ]
+    with mp.get_context('spawn').Pool(processes) as pool:
+        done = 0
+        for count in pool.imap_unordered(_generate_slice, tasks):
+            done += count
+            logger.info(f"Generated {done}/{num_samples} samples")
+    return path
+
+
+def write_parquet(generator, path, num_samples, price_scaler, volume_scaler,
+                  batch_size=1024, seed=0, conditions=None):
+    """
+    Generate num_samples paths into a parquet file, one row group per batch
+
+    Rows are long format: sample_id, step and the five OHLCV columns.
+    Requires pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("write_parquet requires pyarrow, install it with `pip install pyarrow`")
+
+    sequence_length = generator.sequence_length
+    schema = pa.schema(
+        [('sample_id', pa.int64()), ('step', pa.int32())] + [(f, pa.float32()) for f in FEATURES]
+    )
+    steps = np.arange(sequence_length, dtype=np.int32)
+
+    with pq.ParquetWriter(path, schema) as writer:
+        first_id = 0
+        for batch in iter_batches(generator, num_samples, batch_size, seed=seed, conditions=conditions):
+            batch = _scale_back(batch, first_id, price_scaler, volume_scaler, conditions)
+            n = len(batch)
+            flat = batch.reshape(n * sequence_length, len(FEATURES))
+            columns = [
+                pa.array(np.repeat(np.arange(first_id, first_id + n, dtype=np.int64), sequence_length)),
+                pa.array(np.tile(steps, n))
+            ] + [pa.array(flat[:, i]) for i in range(len(FEATURES))]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            first_id += n
+    return path
+
+
+def main():
+    # Usage: python generate_synthetic.py checkpoint.pt data.csv|joint_features.npy output.npy num_samples [processes]
+    import pandas as pd
+    from memequant_gan import MemeTimeseriesDataset
+    from joint_features import JointFeatureDataset
+
+    checkpoint, data_path, output, num_samples = sys.argv[1:5]
+    num_samples = int(num_samples)
+    processes = int(sys.argv[5]) if len(sys.argv) > 5 else os.cpu_count()
+
+    generator = load_generator(torch.load(checkpoint, map_location='cpu'))
+
+    # Scalers (and for a conditional generator, conditioning windows) come from
+    # the data the checkpoint was trained on
+    if generator.condition_dim:
+        if not data_path.endswith('.npy'):
+            raise ValueError("A conditional checkpoint needs the joint_features.npy it was trained on")
+        dataset = JointFeatureDataset(data_path, sequence_length=generator.sequence_length)
+        conditions = ConditionSampler(dataset, num_samples)
+        price_scaler = volume_scaler = None
+    else:
+        dataset = MemeTimeseriesDataset(pd.read_csv(data_path), sequence_length=generator.sequence_length)
+        conditions = None
+        price_scaler, volume_scaler = dataset.price_scaler, dataset.volume_scaler
+
+    writer = write_parquet if output.endswith('.parquet') else write_memmap
+    kwargs = {'processes': processes} if writer is write_memmap else {}
+    writer(generator, output, num_samples, price_scaler, volume_scaler, conditions=conditions, **kwargs)
+    logger.info(f"Wrote {num_samples} samples to {output}")
+
+
+if __name__ == "__main__":
+    main()
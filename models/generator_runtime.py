@@ -0,0 +1,57 @@
+import json
+import numpy as np
+import torch
+
+METADATA_FILE = 'metadata.json'
+
+
+class ExportedGenerator:
+    def __init__(self, path, num_threads=None):
+        """
+        Run a generator saved by export_generator.py without the training code
+
+        path: TorchScript file holding the generator and its scaler metadata
+        num_threads: intra-op threads for inference; None leaves the torch default
+        """
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        extra_files = {METADATA_FILE: ''}
+        self.module = torch.jit.load(path, map_location='cpu', _extra_files=extra_files)
+        self.module.eval()
+
+        metadata = json.loads(extra_files[METADATA_FILE])
+        self.latent_dim = metadata['latent_dim']
+        self.sequence_length = metadata['sequence_length']
+        self.condition_dim = metadata.get('condition_dim', 0)
+        self.price_min = np.array(metadata['price_scaler']['min'], dtype=np.float32)
+        self.price_range = np.array(metadata['price_scaler']['max'], dtype=np.float32) - self.price_min
+        self.volume_min = np.array(metadata['volume_scaler']['min'], dtype=np.float32)
+        self.volume_range = np.array(metadata['volume_scaler']['max'], dtype=np.float32) - self.volume_min
+
+    def generate_scaled(self, num_samples, seed=None, condition=None):
+        """
+        Raw generator output in [0, 1], shape (num_samples, sequence_length, 5)
+
+        condition: (num_samples, sequence_length, condition_dim) scaled conditioning
+                   features, required when the exported generator is conditional
+        """
+        if self.condition_dim and condition is None:
+            raise ValueError(f"This generator is conditional: pass condition with {self.condition_dim} channels")
+        rng = torch.Generator()
+        if seed is not None:
+            rng.manual_seed(seed)
+        else:
+            rng.seed()
+        with torch.inference_mode():
+            z = torch.randn(num_samples, self.latent_dim, generator=rng)
+            if condition is None:
+                return self.module(z).numpy()
+            return self.module(z, torch.as_tensor(condition, dtype=torch.float32)).numpy()
+
+    def generate(self, num_samples, seed=None, condition=None):
+        """Generated OHLCV in price and volume units"""
+        samples = self.generate_scaled(num_samples, seed, condition)
+        samples[:, :, :4] = samples[:, :, :4] * self.price_range + self.price_min
+        samples[:, :, 4:] = samples[:, :, 4:] * self.volume_range + self.volume_min
+        return samples
@@ -0,0 +1,185 @@
+import os
+import sys
+import json
+import sqlite3
+import logging
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import Dataset
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+# market_features columns used as conditioning channels, in tensor order
+SENTIMENT_COLUMNS = ['sentiment_mean', 'tweet_volume', 'engagement_score']
+# Heavy-tailed counts are log-compressed before scaling
+LOG_COLUMNS = ['tweet_volume', 'engagement_score']
+
+
+def index_path(path):
+    """Sidecar JSON holding symbol boundaries and scalers for a joint feature file"""
+    return os.path.splitext(path)[0] + '.index.json'
+
+
+def _padded_min_max(values):
+    """Same padded min-max as MemeTimeseriesDataset._fit_scaler"""
+    min_vals = np.nanmin(values, axis=0)
+    max_vals = np.nanmax(values, axis=0)
+    span = max_vals - min_vals
+    min_vals = min_vals - span * 0.1
+    max_vals = max_vals + span * 0.1
+    # A constant column scales to 0 instead of dividing by zero
+    max_vals = np.where(max_vals > min_vals, max_vals, min_vals + 1.0)
+    return min_vals, max_vals
+
+
+def scale_symbol(df):
+    """
+    Scale one symbol's rows into a float32 (N, 8) block of OHLCV then sentiment channels
+
+    All four price columns share one scaler, unlike MemeTimeseriesDataset which
+    scales each column separately, so low <= open, close <= high still holds
+    after scaling and after inverting it. Missing sentiment (bars with no
+    tweets) becomes 0 before scaling.
+    """
+    block = np.empty((len(df), len(OHLCV_COLUMNS) + len(SENTIMENT_COLUMNS)), dtype=np.float32)
+
+    prices = df[['open', 'high', 'low', 'close']].to_numpy(dtype=np.float64)
+    price_min, price_max = _padded_min_max(prices.ravel()[:, None])
+    block[:, :4] = (prices - price_min) / (price_max - price_min)
+
+    volume = df[['volume']].to_numpy(dtype=np.float64)
+    volume_min, volume_max = _padded_min_max(volume)
+    block[:, 4:5] = (volume - volume_min) / (volume_max - volume_min)
+
+    sentiment = df[SENTIMENT_COLUMNS].fillna(0.0)
+    for column in LOG_COLUMNS:
+        sentiment[column] = np.log1p(sentiment[column].clip(lower=0))
+    sentiment = sentiment.to_numpy(dtype=np.float64)
+    sentiment_min, sentiment_max = _padded_min_max(sentiment)
+    block[:, 5:] = (sentiment - sentiment_min) / (sentiment_max - sentiment_min)
+
+    scalers = {
+        'price': {'min': float(price_min[0]), 'max': float(price_max[0])},
+        'volume': {'min': float(volume_min[0]), 'max': float(volume_max[0])},
+        'sentiment': {'min': sentiment_min.tolist(), 'max': sentiment_max.tolist()}
+    }
+    return block, scalers
+
+
+def build_joint_features(db_path, out_path, symbols=None, min_rows=1):
+    """
+    Precompute the scaled OHLCV + sentiment tensor for every symbol in market_features
+
+    Rows are written symbol by symbol into one (total_rows, 8) float32 .npy
+    file, so training only memory-maps it and slices windows. Symbol
+    boundaries and scalers go to the index sidecar.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        counts = dict(conn.execute(
+            "SELECT symbol, COUNT(*) FROM market_features GROUP BY symbol ORDER BY symbol"
+        ).fetchall())
+        symbols = [s for s in (symbols or counts) if counts.get(s, 0) >= min_rows]
+        total_rows = sum(counts[s] for s in symbols)
+
+        out = np.lib.format.open_memmap(
+            out_path, mode='w+', dtype=np.float32,
+            shape=(total_rows, len(OHLCV_COLUMNS) + len(SENTIMENT_COLUMNS))
+        )
+        index = {'columns': OHLCV_COLUMNS + SENTIMENT_COLUMNS, 'symbols': [], 'offsets': [0], 'scalers': {}}
+
+        row = 0
+        for symbol in symbols:
+            df = pd.read_sql_query(
+                f"""
+                SELECT {', '.join(OHLCV_COLUMNS + SENTIMENT_COLUMNS)} FROM market_features
+                WHERE symbol = ? ORDER BY timestamp
+                """,
+                conn, params=[symbol]
+            )
+            block, scalers = scale_symbol(df)
+            out[row:row + len(block)] = block
+            row += len(block)
+            index['symbols'].append(symbol)
+            index['offsets'].append(row)
+            index['scalers'][symbol] = scalers
+        out.flush()
+    finally:
+        conn.close()
+
+    with open(index_path(out_path), 'w') as f:
+        json.dump(index, f)
+    logger.info(f"Wrote {row} rows for {len(symbols)} symbols to {out_path}")
+    return out_path
+
+
+class JointFeatureDataset(Dataset):
+    def __init__(self, path, sequence_length=100):
+        """
+        Windows over a tensor written by build_joint_features
+
+        The file is memory-mapped, so workers share the page cache instead of
+        each holding a copy. Windows never cross a symbol boundary. Each item
+        is (sequence_length, 8): OHLCV in [..., :5], sentiment in [..., 5:].
+        """
+        self.path = path
+        self.sequence_length = sequence_length
+        with open(index_path(path)) as f:
+            index = json.load(f)
+        self.symbols = index['symbols']
+        self.scalers = index['scalers']
+        self.condition_dim = len(index['columns']) - len(OHLCV_COLUMNS)
+
+        self.offsets = offsets = np.asarray(index['offsets'], dtype=np.int64)
+        starts = [
+            np.arange(offsets[i], offsets[i + 1] - sequence_length + 1, dtype=np.int64)
+            for i in range(len(self.symbols))
+        ]
+        self.window_starts = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+        self._data = None
+
+    @property
+    def data(self):
+        # Opened lazily so the dataset pickles cheaply into DataLoader workers
+        if self._data is None:
+            self._data = np.load(self.path, mmap_mode='r')
+        return self._data
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_data'] = None
+        return state
+
+    def symbol_of(self, indices):
+        """Position in self.symbols of the symbol each window belongs to"""
+        return np.searchsorted(self.offsets, self.window_starts[np.asarray(indices)], side='right') - 1
+
+    def get_batch(self, indices):
+        """Gather several windows into one (batch, sequence_length, 8) tensor"""
+        starts = self.window_starts[np.asarray(indices)]
+        rows = starts[:, None] + np.arange(self.sequence_length)
+        return torch.from_numpy(self.data[rows])
+
+    def __len__(self):
+        return len(self.window_starts)
+
+    def __getitem__(self, idx):
+        start = self.window_starts[idx]
+        return torch.from_numpy(np.array(self.data[start:start + self.sequence_length]))
+
+
+def main():
+    # Usage: python joint_features.py gan_data.db joint_features.npy
+    db_path, out_path = sys.argv[1:3]
+    build_joint_features(db_path, out_path)
+
+
+if __name__ == "__main__":
+    main()
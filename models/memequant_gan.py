@@ -2,7 +2,9 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 import numpy as np
+from typing import Optional
 from torch.utils.data import Dataset, DataLoader
+from train_profiler import TrainStepProfiler, null_stage
 
 class MemeTimeseriesDataset(Dataset):
     def __init__(self, data, sequence_length=100):
@@ -16,8 +18,8 @@ class MemeTimeseriesDataset(Dataset):
         self.price_scaler = self._fit_scaler(data[['open', 'high', 'low', 'close']].values)
         self.volume_scaler = self._fit_scaler(data[['volume']].values)
         
-        # Create sequences
-        self.sequences = self._prepare_sequences(data)
+        # Scaled series stored once; windows are strided views into it
+        self.data = self._prepare_series(data)
         
     def _fit_scaler(self, data):
         """Min-max scaling with padding for extreme values"""
@@ -33,38 +35,70 @@ class MemeTimeseriesDataset(Dataset):
         """Scale data to [0, 1] range"""
         return (data - scaler['min']) / (scaler['max'] - scaler['min'])
     
-    def _prepare_sequences(self, data):
-        """Prepare overlapping sequences of OHLCV data"""
-        sequences = []
-        scaled_prices = self._scale(data[['open', 'high', 'low', 'close']].values, self.price_scaler)
-        scaled_volumes = self._scale(data[['volume']].values, self.volume_scaler)
-        
-        for i in range(len(data) - self.sequence_length):
-            price_seq = scaled_prices[i:i+self.sequence_length]
-            volume_seq = scaled_volumes[i:i+self.sequence_length]
-            sequences.append(np.hstack((price_seq, volume_seq)))
-        
-        return torch.FloatTensor(sequences)
+    def _prepare_series(self, data):
+        """Scale OHLCV into a single contiguous float32 tensor of shape (N, 5)"""
+        series = np.empty((len(data), 5), dtype=np.float32)
+        series[:, :4] = self._scale(data[['open', 'high', 'low', 'close']].values, self.price_scaler)
+        series[:, 4:] = self._scale(data[['volume']].values, self.volume_scaler)
+        return torch.from_numpy(series)
+    
+    @property
+    def sequences(self):
+        """All overlapping windows as a (num_windows, sequence_length, 5) strided view, no copy"""
+        if len(self.data) < self.sequence_length:
+            return self.data.new_empty((0, self.sequence_length, self.data.size(1)))
+        return self.data.unfold(0, self.sequence_length, 1)[:len(self)].transpose(1, 2)
+    
+    def get_batch(self, indices):
+        """Fetch several windows at once; a contiguous range stays a view, other indices gather one copy"""
+        if isinstance(indices, slice):
+            return self.sequences[indices]
+        return self.sequences[torch.as_tensor(indices, dtype=torch.long)]
     
     def __len__(self):
-        return len(self.sequences)
+        return max(len(self.data) - self.sequence_length, 0)
     
     def __getitem__(self, idx):
-        return self.sequences[idx]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"window index {idx} out of range for {len(self)} windows")
+        return self.data[idx:idx + self.sequence_length]
+
+def open_close_extremes(prices):
+    """max(open, close) and min(open, close) as (..., 1) tensors, reduced over a strided view of columns 0 and 3"""
+    open_close = prices[..., 0::3]
+    return open_close.amax(dim=-1, keepdim=True), open_close.amin(dim=-1, keepdim=True)
+
+def project_ohlc(prices, volumes):
+    """Combine (..., 4) prices and (..., 1) volumes into OHLCV with high >= max(open, close) and low <= min(open, close)"""
+    upper, lower = open_close_extremes(prices)
+    return torch.cat([
+        prices[..., 0:1],
+        torch.maximum(prices[..., 1:2], upper),
+        torch.minimum(prices[..., 2:3], lower),
+        prices[..., 3:4],
+        volumes
+    ], dim=-1)
 
 class Generator(nn.Module):
-    def __init__(self, latent_dim=100, sequence_length=100, feature_dim=5):
+    def __init__(self, latent_dim=100, sequence_length=100, feature_dim=5, condition_dim=0):
+        """
+        condition_dim: number of per-step conditioning channels (e.g. aligned sentiment
+                       features) fed alongside the noise; 0 for the unconditional model
+        """
         super(Generator, self).__init__()
         self.latent_dim = latent_dim
         self.sequence_length = sequence_length
         self.feature_dim = feature_dim
+        self.condition_dim = condition_dim
         
         # Initial dense layer to shape the noise
         self.fc = nn.Linear(latent_dim, sequence_length * 128)
         
         # Bidirectional LSTM for temporal dependencies
         self.lstm = nn.LSTM(
-            input_size=128,
+            input_size=128 + condition_dim,
             hidden_size=256,
             num_layers=3,
             batch_first=True,
@@ -90,13 +124,17 @@ class Generator(nn.Module):
             nn.Sigmoid()  # Normalized volume
         )
         
-    def forward(self, z):
+    def forward(self, z, condition: Optional[torch.Tensor] = None):
         batch_size = z.size(0)
         
         # Generate initial sequence
         x = self.fc(z)
         x = x.view(batch_size, self.sequence_length, 128)
         
+        # Append the conditioning channels to every time step
+        if condition is not None:
+            x = torch.cat([x, condition], dim=2)
+        
         # Process through LSTM
         x, _ = self.lstm(x)
         
@@ -109,24 +147,32 @@ class Generator(nn.Module):
         volumes = self.volume_generator(x)
         
         # Combine and ensure OHLC relationships
-        open_price = prices[:, :, 0:1]
-        high_price = prices[:, :, 1:2]
-        low_price = prices[:, :, 2:3]
-        close_price = prices[:, :, 3:4]
-        
-        # Ensure high >= max(open, close) and low <= min(open, close)
-        high_price = torch.maximum(high_price, torch.maximum(open_price, close_price))
-        low_price = torch.minimum(low_price, torch.minimum(open_price, close_price))
-        
-        return torch.cat([open_price, high_price, low_price, close_price, volumes], dim=2)
+        return project_ohlc(prices, volumes)
+
+def load_generator(checkpoint):
+    """
+    Generator rebuilt from a train_gan.py checkpoint dict, with its weights loaded
+
+    Sizes come from the weights: latent_dim and sequence_length from fc, and
+    condition_dim from the LSTM input width (checkpoints saved before it was
+    stored in the checkpoint are conditional if that exceeds 128).
+    """
+    state_dict = checkpoint['generator']
+    latent_dim = state_dict['fc.weight'].shape[1]
+    sequence_length = state_dict['fc.weight'].shape[0] // 128
+    condition_dim = checkpoint.get('condition_dim', state_dict['lstm.weight_ih_l0'].shape[1] - 128)
+    generator = Generator(latent_dim, sequence_length, condition_dim=condition_dim)
+    generator.load_state_dict(state_dict)
+    return generator
 
 class Discriminator(nn.Module):
-    def __init__(self, sequence_length=100, feature_dim=5):
+    def __init__(self, sequence_length=100, feature_dim=5, condition_dim=0):
+        """condition_dim: conditioning channels concatenated to the OHLCV input; 0 for none"""
         super(Discriminator, self).__init__()
         
         # 1D Convolutions for pattern detection
         self.conv_layers = nn.Sequential(
-            nn.Conv1d(feature_dim, 64, kernel_size=3, padding=1),
+            nn.Conv1d(feature_dim + condition_dim, 64, kernel_size=3, padding=1),
             nn.LeakyReLU(0.2),
             nn.Conv1d(64, 128, kernel_size=3, padding=1),
             nn.LeakyReLU(0.2),
@@ -148,7 +194,10 @@ class Discriminator(nn.Module):
         self.attention = nn.MultiheadAttention(512, num_heads=8)
         
         # Output layers
-        self.fc = nn.Sequential(
+        self.fc = self._build_head(sequence_length)
+        
+    def _build_head(self, sequence_length):
+        return nn.Sequential(
             nn.Linear(512 * sequence_length, 512),
             nn.LeakyReLU(0.2),
             nn.Dropout(0.3),
@@ -159,8 +208,10 @@ class Discriminator(nn.Module):
             nn.Sigmoid()
         )
         
-    def forward(self, x):
-        batch_size = x.size(0)
+    def _encode(self, x, condition: Optional[torch.Tensor] = None):
+        """Conv, LSTM and attention trunk: (batch, sequence, features) -> (batch, sequence, 512)"""
+        if condition is not None:
+            x = torch.cat([x, condition], dim=2)
         
         # Apply convolutions
         x = x.transpose(1, 2)  # (batch, features, sequence)
@@ -172,22 +223,84 @@ class Discriminator(nn.Module):
         
         # Apply attention
         x_attn, _ = self.attention(x, x, x)
-        x = x + x_attn  # Residual connection
+        return x + x_attn  # Residual connection
+        
+    def forward(self, x, condition: Optional[torch.Tensor] = None):
+        batch_size = x.size(0)
+        x = self._encode(x, condition)
         
         # Flatten and process through dense layers
         x = x.reshape(batch_size, -1)
         return self.fc(x)
 
+class PooledDiscriminator(Discriminator):
+    def __init__(self, sequence_length=100, feature_dim=5, pooling='attention', condition_dim=0):
+        """
+        Discriminator that pools over time before a small MLP head
+
+        Shares the conv/LSTM/attention trunk with Discriminator but replaces the
+        512 * sequence_length dense layer, so the parameter count no longer
+        grows with the window length.
+        pooling: 'attention' for a learned weighted average over time steps,
+                 'meanmax' for concatenated mean and max pooling
+        """
+        if pooling not in ('attention', 'meanmax'):
+            raise ValueError(f"Unknown pooling {pooling!r}, expected 'attention' or 'meanmax'")
+        self.pooling = pooling
+        super(PooledDiscriminator, self).__init__(sequence_length, feature_dim, condition_dim)
+        
+    def _build_head(self, sequence_length):
+        if self.pooling == 'attention':
+            self.pool_score = nn.Linear(512, 1)
+            pooled_dim = 512
+        else:
+            pooled_dim = 1024
+        
+        return nn.Sequential(
+            nn.Linear(pooled_dim, 256),
+            nn.LeakyReLU(0.2),
+            nn.Dropout(0.3),
+            nn.Linear(256, 1),
+            nn.Sigmoid()
+        )
+        
+    def forward(self, x, condition: Optional[torch.Tensor] = None):
+        x = self._encode(x, condition)
+        
+        # Pool over time and process through the small head
+        if self.pooling == 'attention':
+            weights = torch.softmax(self.pool_score(x), dim=1)  # (batch, sequence, 1)
+            x = (weights * x).sum(dim=1)
+        else:
+            x = torch.cat([x.mean(dim=1), x.amax(dim=1)], dim=1)
+        return self.fc(x)
+
 class MemeQuantGAN:
-    def __init__(self, latent_dim=100, sequence_length=100, feature_dim=5, device='cuda'):
+    def __init__(self, latent_dim=100, sequence_length=100, feature_dim=5, device='cuda',
+                 discriminator='dense', condition_dim=0, profile=False, profile_dir='profiles',
+                 profile_every=100):
+        """
+        discriminator: 'dense' for the original flattened head, or 'attention' / 'meanmax'
+                       for a PooledDiscriminator whose size does not depend on sequence_length
+        condition_dim: number of aligned conditioning channels (e.g. sentiment_mean,
+                       tweet_volume, engagement_score) given to both networks; 0 for none
+        profile: time each train_step stage and network block, writing a Chrome trace and
+                 summary table to profile_dir every profile_every steps (see enable_profiling)
+        """
         self.latent_dim = latent_dim
         self.sequence_length = sequence_length
         self.feature_dim = feature_dim
+        self.condition_dim = condition_dim
         self.device = device
         
         # Initialize networks
-        self.generator = Generator(latent_dim, sequence_length, feature_dim).to(device)
-        self.discriminator = Discriminator(sequence_length, feature_dim).to(device)
+        self.generator = Generator(latent_dim, sequence_length, feature_dim, condition_dim).to(device)
+        if discriminator == 'dense':
+            self.discriminator = Discriminator(sequence_length, feature_dim, condition_dim).to(device)
+        else:
+            self.discriminator = PooledDiscriminator(
+                sequence_length, feature_dim, pooling=discriminator, condition_dim=condition_dim
+            ).to(device)
         
         # Initialize optimizers
         self.g_optimizer = optim.Adam(self.generator.parameters(), lr=0.0002, betas=(0.5, 0.999))
@@ -198,54 +311,97 @@ class MemeQuantGAN:
         
         # Additional loss for realistic OHLCV relationships
         self.mse_loss = nn.MSELoss()
+        
+        # Profiling is off unless requested; stages then cost one shared no-op context
+        self.profiler = None
+        self._stage = null_stage
+        if profile:
+            self.enable_profiling(profile_dir, profile_every)
+    
+    def enable_profiling(self, trace_dir='profiles', every=100):
+        """Start per-stage timing of train_step; returns the TrainStepProfiler holding the stats"""
+        self.disable_profiling()
+        modules = {
+            'generator.lstm': self.generator.lstm,
+            'generator.attention': self.generator.attention,
+            'generator.price_head': self.generator.price_generator,
+            'generator.volume_head': self.generator.volume_generator,
+            'discriminator.conv': self.discriminator.conv_layers,
+            'discriminator.lstm': self.discriminator.lstm,
+            'discriminator.attention': self.discriminator.attention,
+            'discriminator.head': self.discriminator.fc
+        }
+        self.profiler = TrainStepProfiler(trace_dir, every, modules)
+        self._stage = self.profiler.stage
+        return self.profiler
+    
+    def disable_profiling(self):
+        """Stop profiling and remove all hooks, restoring the uninstrumented train_step"""
+        if self.profiler is not None:
+            self.profiler.close()
+        self.profiler = None
+        self._stage = null_stage
     
     def _price_consistency_loss(self, generated_data):
         """Ensure realistic relationships between OHLCV values"""
-        open_price = generated_data[:, :, 0]
-        high_price = generated_data[:, :, 1]
-        low_price = generated_data[:, :, 2]
-        close_price = generated_data[:, :, 3]
+        upper, lower = open_close_extremes(generated_data)
         
         # High should be highest, low should be lowest
-        high_loss = torch.mean(torch.relu(torch.maximum(open_price, close_price) - high_price))
-        low_loss = torch.mean(torch.relu(low_price - torch.minimum(open_price, close_price)))
+        high_loss = torch.mean(torch.relu(upper - generated_data[..., 1:2]))
+        low_loss = torch.mean(torch.relu(generated_data[..., 2:3] - lower))
         
         return high_loss + low_loss
     
-    def train_step(self, real_data):
+    def train_step(self, real_data, condition=None):
+        """
+        real_data: (batch, sequence, feature_dim) scaled OHLCV
+        condition: (batch, sequence, condition_dim) aligned conditioning features, or None
+        """
         batch_size = real_data.size(0)
         real_label = torch.ones(batch_size, 1).to(self.device)
         fake_label = torch.zeros(batch_size, 1).to(self.device)
+        stage = self._stage
         
         # Train Discriminator
         self.d_optimizer.zero_grad()
         
         # Real data
-        d_real_output = self.discriminator(real_data)
-        d_real_loss = self.criterion(d_real_output, real_label)
+        with stage('d_forward_real'):
+            d_real_output = self.discriminator(real_data, condition)
+            d_real_loss = self.criterion(d_real_output, real_label)
         
         # Fake data
-        z = torch.randn(batch_size, self.latent_dim).to(self.device)
-        fake_data = self.generator(z)
-        d_fake_output = self.discriminator(fake_data.detach())
-        d_fake_loss = self.criterion(d_fake_output, fake_label)
+        with stage('g_forward'):
+            z = torch.randn(batch_size, self.latent_dim).to(self.device)
+            fake_data = self.generator(z, condition)
+        with stage('d_forward_fake'):
+            d_fake_output = self.discriminator(fake_data.detach(), condition)
+            d_fake_loss = self.criterion(d_fake_output, fake_label)
         
         d_loss = d_real_loss + d_fake_loss
-        d_loss.backward()
-        self.d_optimizer.step()
+        with stage('d_backward'):
+            d_loss.backward()
+        with stage('d_optimizer'):
+            self.d_optimizer.step()
         
         # Train Generator
         self.g_optimizer.zero_grad()
         
-        g_fake_output = self.discriminator(fake_data)
-        g_loss = self.criterion(g_fake_output, real_label)
+        with stage('d_forward_generator'):
+            g_fake_output = self.discriminator(fake_data, condition)
+            g_loss = self.criterion(g_fake_output, real_label)
         
         # Add price consistency loss
         consistency_loss = self._price_consistency_loss(fake_data)
         g_total_loss = g_loss + 0.1 * consistency_loss
         
-        g_total_loss.backward()
-        self.g_optimizer.step()
+        with stage('g_backward'):
+            g_total_loss.backward()
+        with stage('g_optimizer'):
+            self.g_optimizer.step()
+        
+        if self.profiler is not None:
+            self.profiler.step()
         
         return {
             'd_loss': d_loss.item(),
@@ -253,12 +409,14 @@ class MemeQuantGAN:
             'consistency_loss': consistency_loss.item()
         }
     
-    def generate_samples(self, num_samples=1):
-        """Generate synthetic OHLCV data"""
+    def generate_samples(self, num_samples=1, condition=None):
+        """Generate synthetic OHLCV data, optionally conditioned on (num_samples, sequence, condition_dim) features"""
         self.generator.eval()
         with torch.no_grad():
             z = torch.randn(num_samples, self.latent_dim).to(self.device)
-            fake_data = self.generator(z)
+            if condition is not None:
+                condition = condition.to(self.device)
+            fake_data = self.generator(z, condition)
         self.generator.train()
         return fake_data.cpu().numpy()
 
@@ -0,0 +1,150 @@
+import os
+import random
+import sqlite3
+import pandas as pd
+from torch.utils.data import IterableDataset, get_worker_info
+from memequant_gan import MemeTimeseriesDataset
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class CsvTokenSource:
+    """One standardized OHLCV CSV per token, e.g. ohlcv_data_standardized/<token>_ohlcv.csv"""
+
+    def __init__(self, ohlcv_dir, suffix='_ohlcv.csv'):
+        self.ohlcv_dir = ohlcv_dir
+        self.suffix = suffix
+
+    def tokens(self):
+        return sorted(
+            f[:-len(self.suffix)] for f in os.listdir(self.ohlcv_dir) if f.endswith(self.suffix)
+        )
+
+    def load(self, token):
+        df = pd.read_csv(os.path.join(self.ohlcv_dir, token + self.suffix))
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df.sort_values('timestamp')
+
+
+class SqliteTokenSource:
+    """OHLCV rows for many tokens in one SQLite table, read one token at a time"""
+
+    def __init__(self, db_path, table='ohlcv', token_column='token'):
+        self.db_path = db_path
+        self.table = table
+        self.token_column = token_column
+
+    def tokens(self):
+        # A short-lived connection per call keeps the source picklable for DataLoader workers
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(
+                f"SELECT DISTINCT {self.token_column} FROM {self.table} ORDER BY {self.token_column}"
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def load(self, token):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            df = pd.read_sql_query(
+                f"""
+                SELECT timestamp, {', '.join(OHLCV_COLUMNS)} FROM {self.table}
+                WHERE {self.token_column} = ?
+                ORDER BY timestamp
+                """,
+                conn, params=[token]
+            )
+        finally:
+            conn.close()
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df
+
+
+class MultiTokenStreamDataset(IterableDataset):
+    def __init__(self, source, sequence_length=100, stride=1, shuffle_buffer=10000,
+                 tokens=None, seed=42):
+        """
+        source: CsvTokenSource or SqliteTokenSource
+        sequence_length: number of time steps in each window
+        stride: step between consecutive window starts within a token
+        shuffle_buffer: windows held for shuffling; 0 streams them in order
+        tokens: restrict to these tokens; defaults to everything in the source
+        seed: base seed for token order and buffer shuffling
+        """
+        self.source = source
+        self.sequence_length = sequence_length
+        self.stride = stride
+        self.shuffle_buffer = shuffle_buffer
+        self.tokens = list(tokens) if tokens is not None else source.tokens()
+        self.seed = seed
+        self.epoch = 0
+
+    @classmethod
+    def from_csv_dir(cls, ohlcv_dir, **kwargs):
+        return cls(CsvTokenSource(ohlcv_dir), **kwargs)
+
+    @classmethod
+    def from_sqlite(cls, db_path, table='ohlcv', token_column='token', **kwargs):
+        return cls(SqliteTokenSource(db_path, table, token_column), **kwargs)
+
+    def set_epoch(self, epoch):
+        """Change the token order and shuffle seed for the next pass"""
+        self.epoch = epoch
+
+    def token_dataset(self, token):
+        """
+        Windows for a single token with its own price/volume scalers
+
+        Windows never cross token boundaries because each token gets a
+        separate MemeTimeseriesDataset.
+        """
+        df = self.source.load(token).dropna(subset=OHLCV_COLUMNS)
+        if len(df) <= self.sequence_length:
+            return None
+        return MemeTimeseriesDataset(df, self.sequence_length)
+
+    def _worker_tokens(self, rng):
+        """Shuffled tokens for this pass, sharded so each DataLoader worker reads different files"""
+        tokens = list(self.tokens)
+        rng.shuffle(tokens)
+        worker = get_worker_info()
+        if worker is None:
+            return tokens
+        return tokens[worker.id::worker.num_workers]
+
+    def _windows(self, tokens):
+        for token in tokens:
+            dataset = self.token_dataset(token)
+            if dataset is None:
+                continue
+            for start in range(0, len(dataset), self.stride):
+                yield dataset[start]
+
+    def __iter__(self):
+        worker = get_worker_info()
+        worker_id = worker.id if worker is not None else 0
+
+        # Same token order in every worker so the shards are disjoint
+        tokens = self._worker_tokens(random.Random(self.seed + self.epoch))
+        windows = self._windows(tokens)
+
+        if not self.shuffle_buffer:
+            yield from windows
+            return
+
+        rng = random.Random(self.seed + self.epoch * 1000 + worker_id)
+        buffer = []
+        for window in windows:
+            # Copy out of the per-token series so finished tokens can be freed
+            window = window.clone()
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(window)
+                continue
+            idx = rng.randrange(len(buffer))
+            yield buffer[idx]
+            buffer[idx] = window
+
+        rng.shuffle(buffer)
+        yield from buffer
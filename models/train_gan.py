@@ -0,0 +1,200 @@
+import os
+import sys
+import time
+import glob
+import logging
+import contextlib
+import pandas as pd
+import torch
+from torch.utils.data import DataLoader, IterableDataset
+from memequant_gan import MemeQuantGAN, MemeTimeseriesDataset
+from joint_features import JointFeatureDataset
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class GANTrainer:
+    def __init__(self, gan, dataset, batch_size=64, num_workers=2, intra_threads=None,
+                 inter_threads=None, bf16=False, checkpoint_dir='checkpoints',
+                 checkpoint_every=500, log_every=50):
+        """
+        gan: MemeQuantGAN, normally built with device='cpu'
+        dataset: MemeTimeseriesDataset or a streaming IterableDataset of windows; for a
+                 conditional gan, a JointFeatureDataset of OHLCV + conditioning windows
+        num_workers: DataLoader worker processes preparing batches alongside training
+        intra_threads / inter_threads: torch thread pools; None leaves the torch defaults
+        bf16: run train_step under CPU bfloat16 autocast
+        checkpoint_every: save generator, discriminator and optimizer state every N steps
+        log_every: report steps/sec and samples/sec every N steps
+        """
+        self.gan = gan
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.bf16 = bf16
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self.log_every = log_every
+        self.step = 0
+        self.epoch = 0
+
+        self._set_threads(intra_threads, inter_threads)
+
+    def _set_threads(self, intra_threads, inter_threads):
+        if intra_threads:
+            torch.set_num_threads(intra_threads)
+        if inter_threads:
+            try:
+                torch.set_num_interop_threads(inter_threads)
+            except RuntimeError:
+                # Only settable before the first inter-op parallel work in the process
+                logger.warning("Inter-op thread count already fixed for this process, keeping it")
+        logger.info(f"Using {torch.get_num_threads()} intra-op and {torch.get_num_interop_threads()} inter-op threads")
+
+    def _make_loader(self):
+        streaming = isinstance(self.dataset, IterableDataset)
+        return DataLoader(
+            self.dataset,
+            batch_size=self.batch_size,
+            shuffle=not streaming,
+            num_workers=self.num_workers,
+            pin_memory=False,  # no GPU to pin for
+            drop_last=True,
+            # Streaming datasets reshuffle via set_epoch, which only reaches freshly started workers
+            persistent_workers=self.num_workers > 0 and not streaming
+        )
+
+    def _autocast(self):
+        if self.bf16:
+            return torch.autocast('cpu', dtype=torch.bfloat16)
+        return contextlib.nullcontext()
+
+    def checkpoint_path(self, step):
+        return os.path.join(self.checkpoint_dir, f'memequant_gan_step{step:08d}.pt')
+
+    def save_checkpoint(self):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        path = self.checkpoint_path(self.step)
+        # Write then rename so an interrupted save never leaves a truncated latest checkpoint
+        tmp_path = path + '.tmp'
+        torch.save({
+            'step': self.step,
+            'epoch': self.epoch,
+            'condition_dim': self.gan.condition_dim,
+            'generator': self.gan.generator.state_dict(),
+            'discriminator': self.gan.discriminator.state_dict(),
+            'g_optimizer': self.gan.g_optimizer.state_dict(),
+            'd_optimizer': self.gan.d_optimizer.state_dict()
+        }, tmp_path)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved checkpoint {path}")
+
+    def latest_checkpoint(self):
+        paths = sorted(glob.glob(os.path.join(self.checkpoint_dir, 'memequant_gan_step*.pt')))
+        return paths[-1] if paths else None
+
+    def resume(self, path=None):
+        """Load the given checkpoint, or the latest one in checkpoint_dir; returns True if one was loaded"""
+        path = path or self.latest_checkpoint()
+        if path is None:
+            return False
+        state = torch.load(path, map_location=self.gan.device)
+        self.gan.generator.load_state_dict(state['generator'])
+        self.gan.discriminator.load_state_dict(state['discriminator'])
+        self.gan.g_optimizer.load_state_dict(state['g_optimizer'])
+        self.gan.d_optimizer.load_state_dict(state['d_optimizer'])
+        self.step = state['step']
+        self.epoch = state['epoch']
+        logger.info(f"Resumed from {path} at step {self.step}, epoch {self.epoch}")
+        return True
+
+    def train(self, epochs=10, max_steps=None):
+        """Run training until epochs are done or max_steps is reached; returns the last losses"""
+        loader = self._make_loader()
+        losses = {}
+
+        window_start = time.perf_counter()
+        window_steps = 0
+        window_samples = 0
+
+        while self.epoch < epochs:
+            if hasattr(self.dataset, 'set_epoch'):
+                self.dataset.set_epoch(self.epoch)
+
+            for batch in loader:
+                batch = batch.to(self.gan.device)
+                with self._autocast():
+                    if self.gan.condition_dim:
+                        # Joint feature windows: OHLCV first, conditioning channels after
+                        feature_dim = self.gan.feature_dim
+                        losses = self.gan.train_step(batch[..., :feature_dim], batch[..., feature_dim:])
+                    else:
+                        losses = self.gan.train_step(batch)
+
+                self.step += 1
+                window_steps += 1
+                window_samples += batch.size(0)
+
+                if self.step % self.log_every == 0:
+                    elapsed = time.perf_counter() - window_start
+                    logger.info(
+                        f"epoch {self.epoch} step {self.step}: "
+                        f"d_loss={losses['d_loss']:.4f} g_loss={losses['g_loss']:.4f} "
+                        f"consistency={losses['consistency_loss']:.4f} | "
+                        f"{window_steps / elapsed:.2f} steps/sec, {window_samples / elapsed:.1f} samples/sec"
+                    )
+                    window_start = time.perf_counter()
+                    window_steps = 0
+                    window_samples = 0
+
+                if self.step % self.checkpoint_every == 0:
+                    self.save_checkpoint()
+
+                if max_steps is not None and self.step >= max_steps:
+                    self.save_checkpoint()
+                    return losses
+
+            self.epoch += 1
+
+        self.save_checkpoint()
+        return losses
+
+
+def main():
+    # Usage: python train_gan.py [path/to/ohlcv.csv | path/to/joint_features.npy] [--profile]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    data_path = args[0] if args else os.path.join(
+        os.path.dirname(__file__), '..', 'ohlcv_data_standardized', 'popcat_ohlcv.csv'
+    )
+    sequence_length = 100
+
+    if data_path.endswith('.npy'):
+        # Sentiment-conditioned training on a tensor built by joint_features.py
+        dataset = JointFeatureDataset(data_path, sequence_length=sequence_length)
+        condition_dim = dataset.condition_dim
+    else:
+        df = pd.read_csv(data_path)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df = df.sort_values('timestamp')
+        dataset = MemeTimeseriesDataset(df, sequence_length=sequence_length)
+        condition_dim = 0
+    logger.info(f"Loaded {len(dataset)} windows from {data_path}")
+
+    torch.manual_seed(42)
+    gan = MemeQuantGAN(
+        sequence_length=sequence_length, device='cpu', condition_dim=condition_dim,
+        profile='--profile' in sys.argv
+    )
+
+    trainer = GANTrainer(gan, dataset, intra_threads=os.cpu_count())
+    trainer.resume()
+    trainer.train(epochs=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import os
+import time
+import math
+import logging
+import contextlib
+import torch
+from torch.profiler import profile, schedule, record_function, ProfilerActivity
+
+logger = logging.getLogger(__name__)
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def null_stage(name):
+    """Stage context used when profiling is off: one shared no-op, nothing recorded"""
+    return _NULL_STAGE
+
+
+class RunningStat:
+    """Count, mean, std, min and max of a stream of values (Welford)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class TrainStepProfiler:
+    def __init__(self, trace_dir='profiles', every=100, modules=None):
+        """
+        Per-stage wall time for MemeQuantGAN.train_step plus periodic Chrome traces
+
+        trace_dir: where trace_step<N>.json and summary_step<N>.txt are written
+        every: capture one step with torch.profiler and write the summary every N steps
+        modules: {name: nn.Module} whose forward passes are timed as their own stages
+                 through hooks; removed again by close()
+        """
+        self.trace_dir = trace_dir
+        self.every = every
+        self.steps = 0
+        self.stats = {}
+        self._step_times = {}
+        self._hooks = []
+        self._open = {}
+
+        os.makedirs(trace_dir, exist_ok=True)
+        for name, module in (modules or {}).items():
+            self._hooks.append(module.register_forward_pre_hook(self._pre_hook(name)))
+            self._hooks.append(module.register_forward_hook(self._post_hook(name)))
+
+        self._profiler = profile(
+            activities=[ProfilerActivity.CPU],
+            schedule=schedule(wait=max(every - 2, 0), warmup=1, active=1),
+            on_trace_ready=self._write_trace,
+            record_shapes=True
+        )
+        self._profiler.start()
+
+    def _record(self, name, elapsed):
+        self._step_times[name] = self._step_times.get(name, 0.0) + elapsed
+
+    def _pre_hook(self, name):
+        def hook(module, inputs):
+            scope = record_function(name)
+            scope.__enter__()
+            # Modules such as the discriminator run several times per step; a stack keeps them apart
+            self._open.setdefault(name, []).append((scope, time.perf_counter()))
+        return hook
+
+    def _post_hook(self, name):
+        def hook(module, inputs, output):
+            scope, start = self._open[name].pop()
+            self._record(name, time.perf_counter() - start)
+            scope.__exit__(None, None, None)
+        return hook
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time a block as stage name and mark it as a record_function range in traces"""
+        start = time.perf_counter()
+        with record_function(name):
+            yield
+        self._record(name, time.perf_counter() - start)
+
+    def step(self):
+        """Close the current train step: fold its stage totals into the running stats"""
+        for name, elapsed in self._step_times.items():
+            self.stats.setdefault(name, RunningStat()).add(elapsed)
+        self._step_times = {}
+        self.steps += 1
+        self._profiler.step()
+
+    def summary(self):
+        """Table of per-step stage times in milliseconds, slowest first"""
+        total = sum(stat.mean for name, stat in self.stats.items() if '.' not in name)
+        lines = [
+            f"Stage timings over {self.steps} steps (ms per step)",
+            f"{'stage':<28}{'mean':>10}{'std':>10}{'min':>10}{'max':>10}{'share':>8}"
+        ]
+        for name, stat in sorted(self.stats.items(), key=lambda item: -item[1].mean):
+            share = stat.mean / total * 100 if total else 0.0
+            lines.append(
+                f"{name:<28}{stat.mean * 1000:>10.2f}{stat.std * 1000:>10.2f}"
+                f"{stat.min * 1000:>10.2f}{stat.max * 1000:>10.2f}{share:>7.1f}%"
+            )
+        return '\n'.join(lines)
+
+    def _write_trace(self, prof):
+        trace_path = os.path.join(self.trace_dir, f'trace_step{self.steps:08d}.json')
+        prof.export_chrome_trace(trace_path)
+        summary = self.summary()
+        with open(os.path.join(self.trace_dir, f'summary_step{self.steps:08d}.txt'), 'w') as f:
+            f.write(summary + '\n')
+        logger.info(f"Wrote {trace_path}\n{summary}")
+
+    def close(self):
+        self._profiler.stop()
+        for hook in self._hooks:
+            hook.remove()
+        self._hooks = []
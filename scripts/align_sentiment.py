@@ -0,0 +1,168 @@
+import sqlite3
+import os
+import sys
+import numpy as np
+import pandas as pd
+from create_gan_database import GAN_DB_PATH, create_gan_schema
+
+# Configuration
+OHLCV_DB = os.path.join('databases', 'ohlcv.db')
+SENTIMENT_DB = os.path.join('databases', 'sentiment_data.db')
+
+INTERVAL_SECONDS = {
+    '1s': 1,
+    '1m': 60,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '1h': 3600,
+    '4h': 14400,
+    '1d': 86400
+}
+
+# token_sentiment_timeseries column -> market_features column
+SENTIMENT_COLUMNS = {
+    'sentiment_mean': 'sentiment_mean',
+    'sentiment_std': 'sentiment_volatility',
+    'tweet_count': 'tweet_volume',
+    'engagement_score': 'engagement_score'
+}
+
+
+def to_unix_seconds(values):
+    """Parse timestamp strings into sorted-comparable int64 unix seconds (UTC)"""
+    parsed = pd.to_datetime(pd.Series(values), utc=True, format='mixed')
+    return ((parsed - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+
+
+def asof_indices(bar_ts, bucket_ts, tolerance=None):
+    """
+    For each bar, index of the latest bucket at or before it, or -1
+
+    bar_ts and bucket_ts are sorted int64 arrays. Buckets older than
+    tolerance seconds relative to the bar are treated as missing.
+    """
+    idx = np.searchsorted(bucket_ts, bar_ts, side='right') - 1
+    if tolerance is not None and len(bucket_ts):
+        stale = (bar_ts - bucket_ts[np.maximum(idx, 0)]) > tolerance
+        idx[stale] = -1
+    return idx
+
+
+def asof_join(bars, buckets, tolerance=None):
+    """
+    Attach the latest sentiment bucket at or before each bar
+
+    bars: DataFrame with an int64 'ts' column sorted ascending
+    buckets: DataFrame with an int64 'ts' column sorted ascending plus SENTIMENT_COLUMNS
+    Returns bars with the sentiment columns added (NaN where no bucket matched)
+    """
+    bar_ts = bars['ts'].to_numpy()
+    idx = asof_indices(bar_ts, buckets['ts'].to_numpy(), tolerance)
+    matched = idx >= 0
+
+    result = bars.copy()
+    for src, dst in SENTIMENT_COLUMNS.items():
+        values = np.full(len(bars), np.nan)
+        if len(buckets):
+            column = buckets[src].to_numpy(dtype=float)
+            values[matched] = column[idx[matched]]
+        result[dst] = values
+    return result
+
+
+def load_bars(conn, symbol):
+    """OHLCV bars for one token, sorted by integer timestamp"""
+    bars = pd.read_sql_query("""
+        SELECT p.timestamp, p.open, p.high, p.low, p.close, p.volume
+        FROM ohlcv_src.prices p
+        JOIN ohlcv_src.tokens t ON p.token_id = t.id
+        WHERE t.symbol = ?
+    """, conn, params=[symbol])
+    bars['ts'] = to_unix_seconds(bars['timestamp'])
+    return bars.sort_values('ts', kind='stable').drop_duplicates('ts', keep='last')
+
+
+def load_buckets(conn, symbol, interval, forward_fill=True):
+    """Sentiment buckets for one token and interval, sorted by integer timestamp"""
+    buckets = pd.read_sql_query(f"""
+        SELECT timestamp, {', '.join(SENTIMENT_COLUMNS)}
+        FROM sentiment_src.token_sentiment_timeseries
+        WHERE UPPER(token) = UPPER(?) AND interval = ?
+    """, conn, params=[symbol, interval])
+    buckets['ts'] = to_unix_seconds(buckets['timestamp'])
+    buckets = buckets.sort_values('ts', kind='stable')
+    if forward_fill:
+        # Fill gaps inside the sentiment series itself (e.g. std of a single tweet) before joining
+        buckets[list(SENTIMENT_COLUMNS)] = buckets[list(SENTIMENT_COLUMNS)].ffill()
+    return buckets
+
+
+def write_features(cur, symbol, aligned):
+    """Upsert aligned rows into market_features, leaving indicator columns untouched"""
+    columns = ['open', 'high', 'low', 'close', 'volume'] + list(SENTIMENT_COLUMNS.values())
+    frame = aligned[['ts'] + columns].astype(object)
+    frame = frame.where(pd.notna(frame), None)
+    rows = ((int(row[0]), symbol, *row[1:]) for row in frame.itertuples(index=False, name=None))
+    cur.executemany(f"""
+        INSERT INTO market_features (timestamp, symbol, {', '.join(columns)})
+        VALUES (?, ?, {', '.join('?' for _ in columns)})
+        ON CONFLICT(timestamp, symbol) DO UPDATE SET
+            {', '.join(f'{col} = excluded.{col}' for col in columns)}
+    """, rows)
+
+
+def align_all(interval='1m', max_staleness=None, forward_fill=True, symbols=None):
+    """
+    Fill market_features with OHLCV bars joined as-of to the sentiment series
+
+    interval: sentiment bucket interval to join ('1m', '5m', ...)
+    max_staleness: seconds a bucket may be carried forward; None means no limit
+    forward_fill: if False, a bucket only covers bars inside its own interval
+    symbols: restrict to these token symbols; defaults to every token in ohlcv.db
+    """
+    if forward_fill:
+        tolerance = max_staleness
+    else:
+        tolerance = INTERVAL_SECONDS[interval] - 1
+
+    conn = sqlite3.connect(GAN_DB_PATH)
+    cur = conn.cursor()
+    has_schema = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'market_features'"
+    ).fetchone()
+    if not has_schema:
+        conn.close()
+        create_gan_schema()
+        conn = sqlite3.connect(GAN_DB_PATH)
+        cur = conn.cursor()
+
+    cur.execute("ATTACH DATABASE ? AS ohlcv_src", (OHLCV_DB,))
+    cur.execute("ATTACH DATABASE ? AS sentiment_src", (SENTIMENT_DB,))
+
+    if symbols is None:
+        symbols = [row[0] for row in cur.execute("SELECT symbol FROM ohlcv_src.tokens ORDER BY symbol")]
+
+    # One token at a time keeps memory bounded by the largest single series
+    total_rows = 0
+    for symbol in symbols:
+        bars = load_bars(conn, symbol)
+        if bars.empty:
+            continue
+        buckets = load_buckets(conn, symbol, interval, forward_fill)
+        aligned = asof_join(bars, buckets, tolerance)
+
+        write_features(cur, symbol, aligned)
+        conn.commit()
+
+        matched = int(aligned['sentiment_mean'].notna().sum())
+        total_rows += len(aligned)
+        print(f"{symbol}: {len(aligned)} bars, {matched} with sentiment")
+
+    conn.close()
+    print(f"Aligned {total_rows} bars across {len(symbols)} tokens into {GAN_DB_PATH}")
+
+
+if __name__ == '__main__':
+    # Optional argument: sentiment interval, e.g. `python align_sentiment.py 5m`
+    align_all(interval=sys.argv[1] if len(sys.argv) > 1 else '1m')
@@ -0,0 +1,256 @@
+import sqlite3
+import sys
+import numpy as np
+from create_gan_database import GAN_DB_PATH
+from align_sentiment import asof_indices
+
+# Indicator settings
+RETURNS_HORIZON = 300      # seconds, for returns_5m
+RSI_PERIOD = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+BOLLINGER_WINDOW = 20
+BOLLINGER_STD = 2.0
+
+# Largest decay**-n allowed inside one EWM block before precision suffers
+EWM_BLOCK_EXPONENT = 15.0
+
+INDICATOR_COLUMNS = ['returns_5m', 'spread', 'rsi_14', 'macd', 'bollinger_upper', 'bollinger_lower']
+
+
+def ewm(values, alpha, initial=None):
+    """
+    Exponential moving average y[t] = (1 - alpha) * y[t-1] + alpha * x[t]
+
+    The recursion is unrolled in blocks: inside a block every output is a
+    cumulative sum scaled by powers of the decay, so the Python loop runs
+    once per block rather than once per bar. initial is y[-1]; it defaults
+    to x[0] so the series starts at the first value.
+    """
+    x = np.asarray(values, dtype=float)
+    out = np.empty_like(x)
+    if not len(x):
+        return out
+
+    decay = 1.0 - alpha
+    prev = x[0] if initial is None else initial
+    if decay <= 0:
+        out[:] = x
+        return out
+
+    block = max(1, int(EWM_BLOCK_EXPONENT / -np.log(decay)))
+    powers = decay ** np.arange(1, block + 1)
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        p = powers[:len(chunk)]
+        out[start:start + len(chunk)] = p * (prev + alpha * np.cumsum(chunk / p))
+        prev = out[start + len(chunk) - 1]
+    return out
+
+
+def rolling_mean_std(values, window):
+    """Rolling mean and population std via cumulative sums; the first window - 1 entries are NaN"""
+    x = np.asarray(values, dtype=float)
+    mean = np.full(len(x), np.nan)
+    std = np.full(len(x), np.nan)
+    if len(x) < window:
+        return mean, std
+
+    # Centre on the first value to limit cancellation in the sum of squares
+    shifted = x - x[0]
+    s1 = np.concatenate(([0.0], np.cumsum(shifted)))
+    s2 = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+    win_sum = s1[window:] - s1[:-window]
+    win_sq = s2[window:] - s2[:-window]
+
+    win_mean = win_sum / window
+    mean[window - 1:] = win_mean + x[0]
+    std[window - 1:] = np.sqrt(np.maximum(win_sq / window - win_mean * win_mean, 0.0))
+    return mean, std
+
+
+def compute_indicators(ts, high, low, close, state=None, context=0):
+    """
+    Compute INDICATOR_COLUMNS for a run of bars
+
+    ts, high, low, close: arrays for already-computed context bars followed by new bars
+    state: EWM state carried over from the last computed bar, or None for a full history
+    context: number of leading bars that only serve as lookback for windowed indicators
+    Returns (dict of arrays for the new bars, state after the last bar)
+    """
+    state = dict(state) if state else {}
+    new = slice(context, None)
+    new_close = close[new]
+
+    # returns_5m: close against the latest bar at or before ts - 5 minutes
+    idx = asof_indices(ts[new] - RETURNS_HORIZON, ts)
+    returns = np.full(len(new_close), np.nan)
+    found = idx >= 0
+    returns[found] = new_close[found] / close[idx[found]] - 1.0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spread = (high[new] - low[new]) / new_close
+
+    # Bollinger bands need the lookback bars, so they run over the full array
+    mid, std = rolling_mean_std(close, BOLLINGER_WINDOW)
+    upper = (mid + BOLLINGER_STD * std)[new]
+    lower = (mid - BOLLINGER_STD * std)[new]
+
+    # MACD line from fast and slow EMAs
+    ema_fast = ewm(new_close, 2.0 / (MACD_FAST + 1), state.get('ema_fast'))
+    ema_slow = ewm(new_close, 2.0 / (MACD_SLOW + 1), state.get('ema_slow'))
+    macd = ema_fast - ema_slow
+
+    # RSI with Wilder smoothing of gains and losses
+    last_close = state.get('last_close', new_close[0])
+    delta = np.diff(new_close, prepend=last_close)
+    avg_gain = ewm(np.maximum(delta, 0.0), 1.0 / RSI_PERIOD, state.get('avg_gain', 0.0))
+    avg_loss = ewm(np.maximum(-delta, 0.0), 1.0 / RSI_PERIOD, state.get('avg_loss', 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(avg_loss > 0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss), 100.0)
+
+    # Leave RSI undefined until a full period of changes has been seen
+    bars_seen = state.get('bars_seen', 0) + np.arange(1, len(new_close) + 1)
+    rsi[bars_seen <= RSI_PERIOD] = np.nan
+
+    state.update({
+        'last_timestamp': int(ts[-1]),
+        'last_close': float(new_close[-1]),
+        'ema_fast': float(ema_fast[-1]),
+        'ema_slow': float(ema_slow[-1]),
+        'avg_gain': float(avg_gain[-1]),
+        'avg_loss': float(avg_loss[-1]),
+        'bars_seen': int(bars_seen[-1])
+    })
+
+    features = {
+        'returns_5m': returns,
+        'spread': spread,
+        'rsi_14': rsi,
+        'macd': macd,
+        'bollinger_upper': upper,
+        'bollinger_lower': lower
+    }
+    return features, state
+
+
+def create_state_table(cur):
+    """Per-symbol EWM state so later runs can extend the series without recomputing history"""
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS indicator_state (
+        symbol TEXT PRIMARY KEY,
+        last_timestamp INTEGER NOT NULL,
+        last_close REAL,
+        ema_fast REAL,
+        ema_slow REAL,
+        avg_gain REAL,
+        avg_loss REAL,
+        bars_seen INTEGER
+    )
+    ''')
+
+
+def load_state(cur, symbol):
+    row = cur.execute('''
+        SELECT last_timestamp, last_close, ema_fast, ema_slow, avg_gain, avg_loss, bars_seen
+        FROM indicator_state WHERE symbol = ?
+    ''', (symbol,)).fetchone()
+    if row is None:
+        return None
+    keys = ['last_timestamp', 'last_close', 'ema_fast', 'ema_slow', 'avg_gain', 'avg_loss', 'bars_seen']
+    return dict(zip(keys, row))
+
+
+def save_state(cur, symbol, state):
+    cur.execute('''
+        INSERT OR REPLACE INTO indicator_state
+        (symbol, last_timestamp, last_close, ema_fast, ema_slow, avg_gain, avg_loss, bars_seen)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (symbol, state['last_timestamp'], state['last_close'], state['ema_fast'],
+          state['ema_slow'], state['avg_gain'], state['avg_loss'], state['bars_seen']))
+
+
+def load_bars(cur, symbol, state):
+    """Bars to process plus the lookback context needed by the windowed indicators"""
+    if state is None:
+        start = None
+    else:
+        last_ts = state['last_timestamp']
+        # Enough history for both the Bollinger window and the returns horizon
+        row = cur.execute('''
+            SELECT MIN(timestamp) FROM (
+                SELECT timestamp FROM market_features
+                WHERE symbol = ? AND timestamp <= ?
+                ORDER BY timestamp DESC LIMIT ?
+            )
+        ''', (symbol, last_ts, BOLLINGER_WINDOW - 1)).fetchone()
+        start = min(row[0] if row[0] is not None else last_ts, last_ts - RETURNS_HORIZON)
+
+    query = '''
+        SELECT timestamp, high, low, close FROM market_features
+        WHERE symbol = ? AND close IS NOT NULL
+    '''
+    params = [symbol]
+    if start is not None:
+        query += ' AND timestamp >= ?'
+        params.append(start)
+    query += ' ORDER BY timestamp'
+
+    rows = cur.execute(query, params).fetchall()
+    if not rows:
+        return None, 0
+    data = np.array(rows, dtype=float)
+    ts = data[:, 0].astype(np.int64)
+    context = 0 if state is None else int(np.searchsorted(ts, state['last_timestamp'], side='right'))
+    return (ts, data[:, 1], data[:, 2], data[:, 3]), context
+
+
+def write_indicators(cur, symbol, ts, features):
+    """Bulk update the indicator columns for the given bars"""
+    columns = np.column_stack([features[col] for col in INDICATOR_COLUMNS]).astype(object)
+    columns[np.isnan(columns.astype(float))] = None
+    rows = ((*values, int(t), symbol) for values, t in zip(columns.tolist(), ts.tolist()))
+    cur.executemany(f'''
+        UPDATE market_features
+        SET {', '.join(f'{col} = ?' for col in INDICATOR_COLUMNS)}
+        WHERE timestamp = ? AND symbol = ?
+    ''', rows)
+
+
+def build_indicators(full=False, symbols=None):
+    """
+    Compute technical indicators in market_features for every token
+
+    full: drop saved state and recompute each series from its first bar
+    symbols: restrict to these symbols; defaults to every symbol in market_features
+    """
+    conn = sqlite3.connect(GAN_DB_PATH)
+    cur = conn.cursor()
+    create_state_table(cur)
+    if full:
+        cur.execute('DELETE FROM indicator_state')
+    conn.commit()
+
+    if symbols is None:
+        symbols = [row[0] for row in cur.execute('SELECT DISTINCT symbol FROM market_features ORDER BY symbol')]
+
+    for symbol in symbols:
+        state = load_state(cur, symbol)
+        bars, context = load_bars(cur, symbol, state)
+        if bars is None or context == len(bars[0]):
+            print(f"{symbol}: up to date")
+            continue
+
+        ts, high, low, close = bars
+        features, new_state = compute_indicators(ts, high, low, close, state, context)
+        write_indicators(cur, symbol, ts[context:], features)
+        save_state(cur, symbol, new_state)
+        conn.commit()
+        print(f"{symbol}: computed indicators for {len(ts) - context} bars")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    # `python build_indicators.py --full` recomputes every series from scratch
+    build_indicators(full='--full' in sys.argv)
@@ -0,0 +1,89 @@
+import sqlite3
+import time
+
+
+class AttachMerger:
+    """Merge tables between SQLite databases with set-based INSERT ... SELECT over ATTACHed sources"""
+
+    def __init__(self, target_db, dry_run=False, progress_interval=5.0):
+        """
+        target_db: path of the database that receives the rows
+        dry_run: only count the source rows each step would read, never write
+        progress_interval: seconds between progress messages while a statement runs
+        """
+        self.target_db = target_db
+        self.dry_run = dry_run
+        self.progress_interval = progress_interval
+        self.results = {}
+
+        # Autocommit mode so ATTACH and the explicit per-table transactions are under our control
+        self.conn = sqlite3.connect(target_db, isolation_level=None)
+        self.cur = self.conn.cursor()
+
+    def attach(self, alias, path):
+        """Attach a source database under the given schema alias"""
+        self.cur.execute("ATTACH DATABASE ? AS " + alias, (path,))
+        print(f"Attached {path} as {alias}")
+
+    def detach(self, alias):
+        self.cur.execute("DETACH DATABASE " + alias)
+
+    def _start_progress(self, label):
+        started = time.time()
+        last_report = [started]
+
+        def report():
+            now = time.time()
+            if now - last_report[0] >= self.progress_interval:
+                print(f"  ... {label}: still running ({now - started:.0f}s elapsed)")
+                last_report[0] = now
+            return 0
+
+        # Called every N SQLite VM instructions, cheap enough to leave on for large tables
+        self.conn.set_progress_handler(report, 100000)
+        return started
+
+    def _stop_progress(self):
+        self.conn.set_progress_handler(None, 0)
+
+    def merge(self, label, insert_sql, count_sql):
+        """
+        Run one INSERT ... SELECT in its own transaction
+
+        label: name used in progress output and in self.results
+        insert_sql: set-based INSERT ... SELECT against the attached schemas
+        count_sql: SELECT COUNT(*) over the same source rows, used for reporting and dry runs
+        """
+        source_rows = self.cur.execute(count_sql).fetchone()[0]
+
+        if self.dry_run:
+            print(f"[dry-run] {label}: would read {source_rows} source rows")
+            self.results[label] = {'source_rows': source_rows, 'inserted': 0}
+            return 0
+
+        print(f"Merging {label} ({source_rows} source rows)...")
+        started = self._start_progress(label)
+        try:
+            self.cur.execute("BEGIN")
+            self.cur.execute(insert_sql)
+            inserted = self.cur.rowcount
+            self.cur.execute("COMMIT")
+        except Exception:
+            self.cur.execute("ROLLBACK")
+            raise
+        finally:
+            self._stop_progress()
+
+        elapsed = time.time() - started
+        print(f"  {label}: inserted {inserted} of {source_rows} rows in {elapsed:.1f}s")
+        self.results[label] = {'source_rows': source_rows, 'inserted': inserted}
+        return inserted
+
+    def summary(self):
+        """Print row counts for every merged table"""
+        print("\nMerge summary" + (" (dry run)" if self.dry_run else "") + ":")
+        for label, counts in self.results.items():
+            print(f"- {label}: {counts['inserted']} inserted / {counts['source_rows']} source rows")
+
+    def close(self):
+        self.conn.close()
@@ -1,8 +1,10 @@
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
-from datetime import datetime, timedelta
 import time
 import os
+import sqlite3
+import threading
 from dotenv import load_dotenv
 import logging
 import concurrent.futures
@@ -14,87 +16,176 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# One row per (base, quote) pair: without Block_Time among the selected fields
+# Bitquery aggregates the trades of each pair, so pages hold no duplicates
+PAIRS_QUERY = """
+query ($limit: Int!, $offset: Int!) {
+    EVM(dataset: combined) {
+        DEXTrades(
+            where: {Trade: {Currency: {SmartContract: {is: "WSOL"}}}}
+            orderBy: {descendingByField: "volume"}
+            limit: {count: $limit, offset: $offset}
+        ) {
+            Trade {
+                Currency {
+                    Symbol
+                    SmartContract
+                }
+                Side {
+                    Currency {
+                        Symbol
+                        SmartContract
+                    }
+                }
+            }
+            volume: sum(of: Trade_Amount)
+        }
+    }
+}
+"""
+
+OHLCV_COLUMNS = ['base_address', 'quote_address', 'pair', 'timestamp', 'open', 'high', 'low', 'close',
+                 'volume', 'trades']
+
+
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        """
+        Thread-safe token bucket shared by every request of a scraper
+
+        rate: requests per second allowed by the API quota
+        burst: largest burst; defaults to one second of quota
+        """
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve a token even when none is left, so waiting threads queue up in order
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
 class DexScraper:
-    def __init__(self):
-        """Initialize the DexScraper with API configurations"""
+    def __init__(self, endpoint="https://streaming.bitquery.io/graphql", api_key=None, rate=5.0, pool_size=8,
+                 timeout=(5, 60)):
+        """
+        Initialize the DexScraper with API configurations
+
+        endpoint: GraphQL endpoint; point it at twitter/stub_bitquery_server.py for tests
+        rate: requests per second, shared by every thread using this scraper
+        pool_size: keep-alive connections, at least the number of worker threads
+        timeout: (connect, read) seconds for each request
+        """
         load_dotenv()
-        self.api_key = os.getenv('BITQUERY_API_KEY')
+        self.api_key = api_key or os.getenv('BITQUERY_API_KEY')
         if not self.api_key:
             raise ValueError("BITQUERY_API_KEY not found in environment variables")
             
-        self.endpoint = "https://streaming.bitquery.io/graphql"
+        self.endpoint = endpoint
+        self.timeout = timeout
         self.headers = {
             "Content-Type": "application/json",
             "X-API-KEY": self.api_key
         }
+        
+        # One pooled session for the crawl and every pair fetch
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.limiter = RateLimiter(rate)
 
-    def get_all_pairs(self):
-        """Fetch all available Solana trading pairs from DexRabbit"""
-        query = """
-        query {
-            EVM(dataset: combined) {
-                DEXTrades(
-                    where: {Trade: {Currency: {SmartContract: {is: "WSOL"}}}}
-                    orderBy: {descendingByField: "Block_Time"}
-                    limit: 1000
-                ) {
-                    Trade {
-                        Currency {
-                            Symbol
-                            SmartContract
-                        }
-                        Side {
-                            Currency {
-                                Symbol
-                                SmartContract
-                            }
-                        }
-                    }
-                    Block {
-                        Time
-                    }
-                    volume: sum(of: Trade_Amount)
-                }
-            }
-        }
+    def close(self):
+        self.session.close()
+
+    def post_query(self, query, variables=None, retries=3, label=""):
         """
-        
-        try:
-            response = requests.post(
-                self.endpoint,
-                json={"query": query},
-                headers=self.headers
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if "errors" in data:
-                logger.error(f"GraphQL errors: {data['errors']}")
-                return []
+        POST a query through the limiter and return its data, or None after GraphQL errors
+
+        429 and 5xx responses are retried after Retry-After or an exponential
+        backoff; other request errors are raised once retries run out.
+        """
+        for attempt in range(retries):
+            self.limiter.acquire()
+            try:
+                response = self.session.post(
+                    self.endpoint,
+                    json={"query": query, "variables": variables or {}},
+                    timeout=self.timeout
+                )
+                if response.status_code in RETRY_STATUSES and attempt < retries - 1:
+                    retry_after = response.headers.get('Retry-After')
+                    delay = float(retry_after) if retry_after else 2 ** attempt
+                    logger.warning(f"HTTP {response.status_code} for {label}, retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                response.raise_for_status()
+                data = response.json()
                 
-            pairs = []
-            seen = set()
+                if "errors" in data:
+                    logger.error(f"GraphQL errors for {label}: {data['errors']}")
+                    continue
+                    
+                return data
+                
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Request failed for {label} (attempt {attempt + 1}/{retries}): {str(e)}")
+                if attempt == retries - 1:
+                    raise
+                time.sleep(2 ** attempt)
+        return None
+
+    def get_all_pairs(self, page_size=1000, max_pages=None):
+        """
+        Fetch all available Solana trading pairs from DexRabbit, page by page
+
+        Pages are requested until one comes back short. Pairs are keyed by
+        contract address, which also drops a pair that moved across a page
+        boundary between requests.
+        """
+        pairs = {}
+        page = 0
+        while max_pages is None or page < max_pages:
+            try:
+                data = self.post_query(PAIRS_QUERY, {"limit": page_size, "offset": page * page_size},
+                                       label=f"pairs page {page}")
+            except Exception as e:
+                logger.error(f"Error fetching pairs page {page}: {str(e)}")
+                break
+            if data is None:
+                break
             
-            for trade in data["data"]["EVM"]["DEXTrades"]:
+            rows = data["data"]["EVM"]["DEXTrades"]
+            for trade in rows:
                 base = trade["Trade"]["Currency"]
                 quote = trade["Trade"]["Side"]["Currency"]
-                
-                pair_key = f"{base['Symbol']}/{quote['Symbol']}"
-                if pair_key not in seen:
-                    pairs.append({
+                key = (base["SmartContract"], quote["SmartContract"])
+                if key not in pairs:
+                    pairs[key] = {
                         "base_symbol": base["Symbol"],
                         "base_address": base["SmartContract"],
                         "quote_symbol": quote["Symbol"],
                         "quote_address": quote["SmartContract"],
-                        "pair": pair_key
-                    })
-                    seen.add(pair_key)
-            
-            return pairs
-            
-        except Exception as e:
-            logger.error(f"Error fetching pairs: {str(e)}")
-            return []
+                        "pair": f"{base['Symbol']}/{quote['Symbol']}"
+                    }
+            logger.info(f"Pairs page {page}: {len(rows)} rows, {len(pairs)} pairs so far")
+            if len(rows) < page_size:
+                break
+            page += 1
+        
+        return list(pairs.values())
 
     def construct_query(self, token_address, quote_address, interval_seconds=60):
         """Construct GraphQL query for token data"""
@@ -138,27 +229,10 @@ class DexScraper:
             "interval": interval_seconds
         }
 
-        for attempt in range(retries):
-            try:
-                response = requests.post(
-                    self.endpoint,
-                    json={"query": query, "variables": variables},
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                if "errors" in data:
-                    logger.error(f"GraphQL errors for {pair_info['pair']}: {data['errors']}")
-                    continue
-                    
-                return self._process_response(data, pair_info)
-                
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request failed for {pair_info['pair']} (attempt {attempt + 1}/{retries}): {str(e)}")
-                if attempt == retries - 1:
-                    raise
-                time.sleep(2 ** attempt)
+        data = self.post_query(query, variables, retries, label=pair_info['pair'])
+        if data is None:
+            return pd.DataFrame()
+        return self._process_response(data, pair_info)
 
     def _process_response(self, response_data, pair_info):
         """Process the API response into a pandas DataFrame"""
@@ -168,82 +242,130 @@ class DexScraper:
             logger.warning(f"No trade data found for {pair_info['pair']}")
             return pd.DataFrame()
             
-        processed_data = []
-        for trade in trades:
-            processed_data.append({
-                'pair': pair_info['pair'],
-                'timestamp': trade['Block']['Time'],
-                'open': float(trade['open']),
-                'high': float(trade['max']),
-                'low': float(trade['min']),
-                'close': float(trade['close']),
-                'volume': float(trade['volume']),
-                'trades': int(trade['trades'])
-            })
-            
-        df = pd.DataFrame(processed_data)
+        df = pd.DataFrame({
+            'base_address': pair_info['base_address'],
+            'quote_address': pair_info['quote_address'],
+            'pair': pair_info['pair'],
+            'timestamp': [trade['Block']['Time'] for trade in trades],
+            'open': [float(trade['open']) for trade in trades],
+            'high': [float(trade['max']) for trade in trades],
+            'low': [float(trade['min']) for trade in trades],
+            'close': [float(trade['close']) for trade in trades],
+            'volume': [float(trade['volume']) for trade in trades],
+            'trades': [int(trade['trades']) for trade in trades]
+        })
         df['timestamp'] = pd.to_datetime(df['timestamp'])
         return df
 
-    def save_to_csv(self, df, pair, output_dir="dex_data"):
-        """Save the DataFrame to a CSV file"""
+
+class OhlcvWriter:
+    def __init__(self, db_path, batch_rows=100000):
+        """
+        Buffer every pair's bars and write them to one SQLite table in bulk
+
+        batch_rows: buffered rows that trigger a write, bounding memory on large crawls
+        """
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS dex_ohlcv (
+            base_address TEXT NOT NULL,
+            quote_address TEXT NOT NULL,
+            pair TEXT,
+            timestamp TEXT NOT NULL,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume REAL,
+            trades INTEGER,
+            PRIMARY KEY (base_address, quote_address, timestamp)
+        )
+        ''')
+        self.conn.commit()
+        self.batch_rows = batch_rows
+        self.frames = []
+        self.buffered = 0
+        self.written = 0
+
+    def add(self, df):
         if df.empty:
-            logger.warning(f"No data to save for {pair}")
             return
-            
-        os.makedirs(output_dir, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{pair.replace('/', '_')}_{timestamp}.csv"
-        filepath = os.path.join(output_dir, filename)
-        
-        df.to_csv(filepath, index=False)
-        logger.info(f"Saved data to {filepath}")
-        return filepath
+        self.frames.append(df)
+        self.buffered += len(df)
+        if self.buffered >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered bars in one transaction; refetched bars replace stored ones"""
+        if not self.frames:
+            return
+        df = pd.concat(self.frames, ignore_index=True)
+        df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO dex_ohlcv ({', '.join(OHLCV_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(OHLCV_COLUMNS))})",
+                df[OHLCV_COLUMNS].itertuples(index=False, name=None)
+            )
+        self.written += len(df)
+        self.frames = []
+        self.buffered = 0
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
 
 def process_pair(scraper, pair_info):
-    """Process a single trading pair"""
+    """Fetch a single trading pair, returning its bars or None on failure"""
     try:
-        logger.info(f"Fetching data for {pair_info['pair']}...")
         df = scraper.fetch_pair_data(pair_info)
         
         if not df.empty:
-            filepath = scraper.save_to_csv(df, pair_info['pair'])
-            logger.info(f"Successfully saved {pair_info['pair']} data to {filepath}")
-            logger.info(f"Data summary for {pair_info['pair']}:")
-            logger.info(f"Time range: {df['timestamp'].min()} to {df['timestamp'].max()}")
-            logger.info(f"Number of candlesticks: {len(df)}")
-            logger.info(f"Price range: {df['low'].min():.6f} to {df['high'].max():.6f}")
-            logger.info(f"Total volume: {df['volume'].sum():.2f}")
-            return True
+            logger.debug(f"{pair_info['pair']}: {len(df)} candlesticks, "
+                         f"{df['timestamp'].min()} to {df['timestamp'].max()}")
+            return df
         else:
             logger.warning(f"No data retrieved for {pair_info['pair']}")
-            return False
+            return None
             
     except Exception as e:
         logger.error(f"Error processing {pair_info['pair']}: {str(e)}")
-        return False
+        return None
 
-def main():
-    scraper = DexScraper()
-    
-    # Fetch all available pairs
-    pairs = scraper.get_all_pairs()
+def scrape(scraper, writer, max_workers=8, max_pages=None):
+    """Crawl the pair listing, fetch every pair on a thread pool and hand the bars to writer"""
+    pairs = scraper.get_all_pairs(max_pages=max_pages)
     logger.info(f"Found {len(pairs)} trading pairs")
     
-    # Process pairs in parallel
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+    completed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
         futures = [
             executor.submit(process_pair, scraper, pair_info)
             for pair_info in pairs
         ]
         
-        # Wait for all tasks to complete
-        completed = 0
+        # The writer is only touched from this thread, so SQLite needs no locking
         for future in concurrent.futures.as_completed(futures):
-            if future.result():
+            df = future.result()
+            if df is not None:
+                writer.add(df)
                 completed += 1
-                
-    logger.info(f"Successfully processed {completed}/{len(pairs)} pairs")
+    writer.flush()
+    
+    logger.info(f"Successfully processed {completed}/{len(pairs)} pairs, {writer.written} bars written")
+    return completed, len(pairs)
+
+def main():
+    max_workers = 8
+    scraper = DexScraper(pool_size=max_workers)
+    os.makedirs('dex_data', exist_ok=True)
+    writer = OhlcvWriter('dex_data/dex_ohlcv.db')
+    try:
+        scrape(scraper, writer, max_workers)
+    finally:
+        writer.close()
+        scraper.close()
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,5 @@
-import pandas as pd
 from twitter.BITQUERY_API import BitqueryClient
+from twitter.token_registry import get_registry
 import os
 import logging
 from time import sleep
@@ -16,7 +16,7 @@ def main():
     os.makedirs('ohlcv_data', exist_ok=True)
     
     # Read active tokens
-    tokens_df = pd.read_csv('active_tokens.csv')
+    registry = get_registry(['active_tokens.csv'])
     
     # Initialize BitQuery client
     client = BitqueryClient()
@@ -25,9 +25,9 @@ def main():
     usdc_address = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
     
     # Process each token
-    for index, row in tokens_df.iterrows():
-        token_address = row['MintAddress']
-        symbol = row['Symbol']
+    for token in registry:
+        token_address = token.address
+        symbol = token.symbol
         
         # Skip USDC itself
         if token_address == usdc_address:
@@ -1,5 +1,5 @@
-import pandas as pd
 from twitter.BITQUERY_API import BitqueryClient
+from twitter.token_registry import get_registry
 import os
 import logging
 from time import sleep
@@ -29,7 +29,7 @@ def main():
     ]
     
     # Read active tokens
-    tokens_df = pd.read_csv('active_tokens.csv')
+    registry = get_registry(['active_tokens.csv'])
     
     # Initialize BitQuery client
     client = BitqueryClient()
@@ -40,14 +40,14 @@ def main():
     # Process each specific token
     for token_name in specific_tokens:
         # Find the token in our active_tokens.csv
-        token_info = tokens_df[tokens_df['Symbol'].str.lower() == token_name.lower()]
+        token = registry.symbol(token_name)
         
-        if token_info.empty:
+        if token is None:
             logger.warning(f"Token {token_name} not found in active_tokens.csv")
             continue
             
-        token_address = token_info.iloc[0]['MintAddress']
-        symbol = token_info.iloc[0]['Symbol']
+        token_address = token.address
+        symbol = token.symbol
         output_file = f'ohlcv_data/{token_name.lower()}_ohlcv.csv'
         
         try:
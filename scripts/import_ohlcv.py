@@ -1,17 +1,82 @@
 import os
 import glob
 import json
-import pandas as pd
 import sqlite3
 
+TRADES_KEY = '"DEXTradeByTokens"'
+COLUMNS = ['datetime', 'open', 'high', 'low', 'close', 'volume']
 
-def import_json_to_sqlite():
-    # Path to the SQLite database
-    db_path = os.path.join('databases', 'ohlcv.db')
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
 
-    # Create the ohlcv_data table if it doesn't exist
+def iter_trades(file_path, chunk_size=1 << 16):
+    """
+    Yield the entries of Solana.DEXTradeByTokens one at a time
+
+    The dump is read in chunk_size pieces and each trade object is decoded
+    as soon as it is complete, so memory stays bounded by the chunk size
+    rather than the size of the file.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r') as f:
+        # Find the opening bracket of the trades array
+        buf = ''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            buf += chunk
+            key_pos = buf.find(TRADES_KEY)
+            if key_pos == -1:
+                # Keep enough of the tail to match a key split across chunks
+                buf = buf[-len(TRADES_KEY):]
+                continue
+            array_pos = buf.find('[', key_pos)
+            if array_pos != -1:
+                buf = buf[array_pos + 1:]
+                break
+
+        pos = 0
+        eof = False
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            try:
+                if pos == len(buf):
+                    raise ValueError('buffer exhausted')
+                trade, pos = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # Object is split across chunks, pull in more data and retry
+                if eof:
+                    raise ValueError(f"Truncated DEXTradeByTokens array in {file_path}")
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            yield trade
+
+
+def iter_batches(file_path, batch_size=5000):
+    """Group streamed trades into typed columnar batches keyed by COLUMNS"""
+    batch = {col: [] for col in COLUMNS}
+    for trade in iter_trades(file_path):
+        close = float(trade['close'])
+        batch['datetime'].append(trade['Block']['Time'])
+        batch['open'].append(float(trade.get('open', close)))  # fallback to close if open not available
+        batch['high'].append(float(trade.get('max', close)))   # max is used for high
+        batch['low'].append(float(trade.get('min', close)))    # min is used for low
+        batch['close'].append(close)
+        batch['volume'].append(float(trade.get('volume', 0)))  # default to 0 if volume not available
+        if len(batch['datetime']) >= batch_size:
+            yield batch
+            batch = {col: [] for col in COLUMNS}
+    if batch['datetime']:
+        yield batch
+
+
+def create_ohlcv_table(cur):
+    """Create the ohlcv_data table and its unique (token, datetime) index"""
     cur.execute('''
     CREATE TABLE IF NOT EXISTS ohlcv_data (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -25,6 +90,52 @@ def import_json_to_sqlite():
     )
     ''')
 
+    # Earlier imports appended blindly, so drop their duplicates before adding the unique key
+    cur.execute('''
+    DELETE FROM ohlcv_data
+    WHERE id NOT IN (
+        SELECT MAX(id)
+        FROM ohlcv_data
+        GROUP BY token, datetime
+    )
+    ''')
+    if cur.rowcount > 0:
+        print(f"Removed {cur.rowcount} duplicate rows from ohlcv_data")
+
+    cur.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_ohlcv_data_token_datetime
+    ON ohlcv_data(token, datetime)
+    ''')
+
+
+def write_batch(cur, token, batch):
+    """Upsert one columnar batch with executemany"""
+    rows = zip(
+        [token] * len(batch['datetime']),
+        *(batch[col] for col in COLUMNS)
+    )
+    cur.executemany('''
+    INSERT INTO ohlcv_data (token, datetime, open, high, low, close, volume)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(token, datetime) DO UPDATE SET
+        open = excluded.open,
+        high = excluded.high,
+        low = excluded.low,
+        close = excluded.close,
+        volume = excluded.volume
+    ''', rows)
+
+
+def import_json_to_sqlite(batch_size=5000):
+    # Path to the SQLite database
+    db_path = os.path.join('databases', 'ohlcv.db')
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+
+    # Create the ohlcv_data table if it doesn't exist
+    create_ohlcv_table(cur)
+    conn.commit()
+
     # Directory containing the files
     data_folder = os.path.join(os.getcwd(), 'data', 'ohlcv')
     files = glob.glob(os.path.join(data_folder, '*.csv'))
@@ -33,36 +144,18 @@ def import_json_to_sqlite():
         # The token name is the filename before .csv
         token = os.path.basename(file_path).split('.')[0]
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                # Extract the trade data array
-                trades = data['Solana']['DEXTradeByTokens']
-                
-                # Convert to DataFrame
-                rows = []
-                for trade in trades:
-                    row = {
-                        'token': token,
-                        'datetime': trade['Block']['Time'],
-                        'open': trade.get('open', trade['close']),  # fallback to close if open not available
-                        'high': trade.get('max', trade['close']),   # max is used for high
-                        'low': trade.get('min', trade['close']),    # min is used for low
-                        'close': trade['close'],
-                        'volume': trade.get('volume', 0)  # default to 0 if volume not available
-                    }
-                    rows.append(row)
-                
-                df = pd.DataFrame(rows)
-                
-                # Insert data into the SQLite database table
-                df.to_sql('ohlcv_data', conn, if_exists='append', index=False)
-                print(f"Imported data for token {token} from {file_path}")
-                
+            rows = 0
+            for batch in iter_batches(file_path, batch_size):
+                write_batch(cur, token, batch)
+                rows += len(batch['datetime'])
+            conn.commit()
+            print(f"Imported {rows} bars for token {token} from {file_path}")
+
         except Exception as e:
+            conn.rollback()
             print(f"Error processing {file_path}: {e}")
             continue
 
-    conn.commit()
     conn.close()
 
 
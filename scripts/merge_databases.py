@@ -1,6 +1,7 @@
 import sqlite3
 import os
-from tqdm import tqdm
+import sys
+from db_merge import AttachMerger
 
 # Configuration
 OLD_SENTIMENT_DB = os.path.join('databases', 'sentiment_data.db')
@@ -55,62 +56,60 @@ def create_unified_schema():
     conn.commit()
     conn.close()
 
-# Migrate data with progress bars
-def migrate_data():
-    # Connect to all databases
-    src_conn = sqlite3.connect(OLD_OHLCV_DB)
-    dst_conn = sqlite3.connect(NEW_DB)
-    sentiment_conn = sqlite3.connect(OLD_SENTIMENT_DB)
-    
-    # Migrate tokens
-    print("Migrating tokens...")
-    src_cur = src_conn.cursor()
-    dst_cur = dst_conn.cursor()
-    
-    tokens = src_cur.execute("SELECT symbol, created_at FROM tokens").fetchall()
-    for symbol, created_at in tqdm(tokens):
-        dst_cur.execute("INSERT OR IGNORE INTO tokens (symbol, created_at) VALUES (?, ?)", 
-                      (symbol, created_at))
-    
-    # Migrate prices
-    print("\nMigrating price data...")
-    src_cur.execute("""
-        SELECT t.symbol, p.timestamp, p.open, p.high, p.low, p.close, p.volume
-        FROM prices p
-        JOIN tokens t ON p.token_id = t.id
-    """)
-    
-    prices = src_cur.fetchall()
-    for symbol, ts, o, h, l, c, v in tqdm(prices):
-        dst_cur.execute("""
-            INSERT INTO prices (token_id, timestamp, open, high, low, close, volume)
-            VALUES (
-                (SELECT id FROM tokens WHERE symbol = ?),
-                ?, ?, ?, ?, ?, ?
-            )
-        """, (symbol, ts, o, h, l, c, v))
-    
-    # Migrate sentiment timeseries
-    print("\nMigrating sentiment data...")
-    sentiment_cur = sentiment_conn.cursor()
-    sentiment_data = sentiment_cur.execute("""
-        SELECT timestamp, token, interval, sentiment_mean, sentiment_std,
-               tweet_count, positive_ratio, negative_ratio, neutral_ratio, engagement_score
-        FROM token_sentiment_timeseries
-    """).fetchall()
-    
-    for row in tqdm(sentiment_data):
-        dst_cur.execute("""
-            INSERT INTO token_sentiment_timeseries
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, row)
-    
-    dst_conn.commit()
-    src_conn.close()
-    sentiment_conn.close()
-    dst_conn.close()
+# Migrate data with set-based INSERT ... SELECT over the attached source databases
+def migrate_data(dry_run=False):
+    merger = AttachMerger(NEW_DB, dry_run=dry_run)
+    try:
+        merger.attach('ohlcv_src', OLD_OHLCV_DB)
+        merger.attach('sentiment_src', OLD_SENTIMENT_DB)
+        
+        # Migrate tokens
+        merger.merge(
+            'tokens',
+            """
+            INSERT OR IGNORE INTO main.tokens (symbol, created_at)
+            SELECT symbol, created_at FROM ohlcv_src.tokens
+            """,
+            "SELECT COUNT(*) FROM ohlcv_src.tokens"
+        )
+        
+        # Migrate prices, resolving token ids with a join instead of a per-row subquery
+        merger.merge(
+            'prices',
+            """
+            INSERT INTO main.prices (token_id, timestamp, open, high, low, close, volume)
+            SELECT dst.id, p.timestamp, p.open, p.high, p.low, p.close, p.volume
+            FROM ohlcv_src.prices p
+            JOIN ohlcv_src.tokens t ON p.token_id = t.id
+            JOIN main.tokens dst ON dst.symbol = t.symbol
+            """,
+            """
+            SELECT COUNT(*)
+            FROM ohlcv_src.prices p
+            JOIN ohlcv_src.tokens t ON p.token_id = t.id
+            """
+        )
+        
+        # Migrate sentiment timeseries
+        merger.merge(
+            'token_sentiment_timeseries',
+            """
+            INSERT INTO main.token_sentiment_timeseries
+            SELECT timestamp, token, interval, sentiment_mean, sentiment_std,
+                   tweet_count, positive_ratio, negative_ratio, neutral_ratio, engagement_score
+            FROM sentiment_src.token_sentiment_timeseries
+            """,
+            "SELECT COUNT(*) FROM sentiment_src.token_sentiment_timeseries"
+        )
+        
+        merger.summary()
+    finally:
+        merger.close()
 
 if __name__ == '__main__':
-    create_unified_schema()
-    migrate_data()
-    print("\nDatabase merge complete! New database:", NEW_DB)
+    dry_run = '--dry-run' in sys.argv
+    if not dry_run:
+        create_unified_schema()
+    migrate_data(dry_run=dry_run)
+    if not dry_run:
+        print("\nDatabase merge complete! New database:", NEW_DB)
@@ -1,5 +1,7 @@
 import sqlite3
 import os
+import sys
+from db_merge import AttachMerger
 
 # File paths
 OHLCV_DB = os.path.join('databases', 'ohlcv.db')
@@ -56,87 +58,71 @@ def create_unified_schema():
     conn.close()
 
 
-def migrate_tokens():
+def migrate_tokens(merger):
     # Migrate tokens from ohlcv.db
-    src_conn = sqlite3.connect(OHLCV_DB)
-    src_cur = src_conn.cursor()
-    tokens = src_cur.execute("SELECT symbol, created_at FROM tokens").fetchall()
-    src_conn.close()
-
-    dst_conn = sqlite3.connect(UNIFIED_DB)
-    dst_cur = dst_conn.cursor()
-    
-    for symbol, created_at in tokens:
-        dst_cur.execute("INSERT OR IGNORE INTO tokens (symbol, created_at) VALUES (?, ?)", (symbol, created_at))
-    
-    dst_conn.commit()
-    dst_conn.close()
-    print(f"Migrated {len(tokens)} tokens.")
+    merger.merge(
+        'tokens',
+        """
+        INSERT OR IGNORE INTO main.tokens (symbol, created_at)
+        SELECT symbol, created_at FROM ohlcv_src.tokens
+        """,
+        "SELECT COUNT(*) FROM ohlcv_src.tokens"
+    )
 
 
-def migrate_market_features():
+def migrate_market_features(merger):
     # Migrate market data from ohlcv.db
-    src_conn = sqlite3.connect(OHLCV_DB)
-    src_cur = src_conn.cursor()
-
-    query = """
+    merger.merge(
+        'market_features',
+        """
+        INSERT INTO main.market_features (token_symbol, timestamp, open, high, low, close, volume)
         SELECT t.symbol, p.timestamp, p.open, p.high, p.low, p.close, p.volume
-        FROM prices p
-        JOIN tokens t ON p.token_id = t.id
-    """
-    rows = src_cur.execute(query).fetchall()
-    src_conn.close()
-
-    dst_conn = sqlite3.connect(UNIFIED_DB)
-    dst_cur = dst_conn.cursor()
+        FROM ohlcv_src.prices p
+        JOIN ohlcv_src.tokens t ON p.token_id = t.id
+        """,
+        """
+        SELECT COUNT(*)
+        FROM ohlcv_src.prices p
+        JOIN ohlcv_src.tokens t ON p.token_id = t.id
+        """
+    )
+
+
+def migrate_sentiment_timeseries(merger):
+    # Migrate sentiment data from sentiment_data.db, the token column becomes token_symbol
+    merger.merge(
+        'token_sentiment_timeseries',
+        """
+        INSERT INTO main.token_sentiment_timeseries
+        (timestamp, token_symbol, interval, sentiment_mean, sentiment_std, tweet_count, positive_ratio, negative_ratio, neutral_ratio, engagement_score)
+        SELECT timestamp, token, interval, sentiment_mean, sentiment_std, tweet_count, positive_ratio, negative_ratio, neutral_ratio, engagement_score
+        FROM sentiment_src.token_sentiment_timeseries
+        """,
+        "SELECT COUNT(*) FROM sentiment_src.token_sentiment_timeseries"
+    )
+
+
+def run_migration(dry_run=False):
+    if not dry_run:
+        print("Creating unified schema...")
+        create_unified_schema()
     
-    for row in rows:
-        symbol, ts, o, h, l, c, v = row
-        dst_cur.execute("""
-            INSERT INTO market_features (token_symbol, timestamp, open, high, low, close, volume)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (symbol, ts, o, h, l, c, v))
-    dst_conn.commit()
-    dst_conn.close()
-    print(f"Migrated {len(rows)} market feature records.")
-
-
-def migrate_sentiment_timeseries():
-    # Migrate sentiment data from sentiment_data.db
-    src_conn = sqlite3.connect(SENTIMENT_DB)
-    src_cur = src_conn.cursor()
-
-    # Assumes table is named token_sentiment_timeseries and token column will be used as token_symbol
-    query = "SELECT timestamp, token, interval, sentiment_mean, sentiment_std, tweet_count, positive_ratio, negative_ratio, neutral_ratio, engagement_score FROM token_sentiment_timeseries"
-    rows = src_cur.execute(query).fetchall()
-    src_conn.close()
-
-    dst_conn = sqlite3.connect(UNIFIED_DB)
-    dst_cur = dst_conn.cursor()
+    merger = AttachMerger(UNIFIED_DB, dry_run=dry_run)
+    try:
+        merger.attach('ohlcv_src', OHLCV_DB)
+        merger.attach('sentiment_src', SENTIMENT_DB)
+        print("Migrating tokens...")
+        migrate_tokens(merger)
+        print("Migrating market features...")
+        migrate_market_features(merger)
+        print("Migrating sentiment timeseries data...")
+        migrate_sentiment_timeseries(merger)
+        merger.summary()
+    finally:
+        merger.close()
     
-    for row in rows:
-        # Replace token with token_symbol
-        ts, token, interval, s_mean, s_std, tw_count, pos_ratio, neg_ratio, neu_ratio, eng_score = row
-        dst_cur.execute("""
-            INSERT INTO token_sentiment_timeseries
-            (timestamp, token_symbol, interval, sentiment_mean, sentiment_std, tweet_count, positive_ratio, negative_ratio, neutral_ratio, engagement_score)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (ts, token, interval, s_mean, s_std, tw_count, pos_ratio, neg_ratio, neu_ratio, eng_score))
-    dst_conn.commit()
-    dst_conn.close()
-    print(f"Migrated {len(rows)} sentiment timeseries records.")
-
-
-def run_migration():
-    print("Creating unified schema...")
-    create_unified_schema()
-    print("Migrating tokens...")
-    migrate_tokens()
-    print("Migrating market features...")
-    migrate_market_features()
-    print("Migrating sentiment timeseries data...")
-    migrate_sentiment_timeseries()
-    print("Migration complete. Unified database created at:", UNIFIED_DB)
+    if not dry_run:
+        print("Migration complete. Unified database created at:", UNIFIED_DB)
 
 if __name__ == '__main__':
-    run_migration()
+    run_migration(dry_run='--dry-run' in sys.argv)
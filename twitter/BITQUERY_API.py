@@ -1,12 +1,16 @@
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import time
 from datetime import datetime, timedelta
 import os
 import logging
-import http.client
 import json
 from dotenv import load_dotenv
+try:
+    from response_cache import ResponseCache
+except ImportError:  # imported as twitter.BITQUERY_API from the repo root
+    from twitter.response_cache import ResponseCache
 
 # Load environment variables
 load_dotenv()
@@ -18,48 +22,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class BitqueryClient:
-    def __init__(self):
-        self.api_key = os.getenv('BIT_3_TOKEN')
-        if not self.api_key:
-            raise ValueError("API key is required. Please set BIT_3_TOKEN in your .env file")
-        
-        self.endpoint = "streaming.bitquery.io"
-        self.headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-    
-    def fetch_ohlcv_data(self, token_address, base_address, symbol="", interval="1s", days_ago=1):
-        """
-        Fetch OHLCV data for a given token pair
-        
-        Args:
-            token_address (str): Token address
-            base_address (str): Base token address
-            symbol (str): Symbol for logging
-            interval (str): Time interval for the data (default "1s" for 1 second)
-            days_ago (int): Number of days of historical data to fetch (default 1 to avoid overwhelming with seconds data)
-        """
-        logger.info(f"Fetching {days_ago} days of {interval} data for {symbol}...")
-        
-        # Convert interval to seconds for the query
-        interval_map = {
-            "1s": 1,  # 1 second
-            "1m": 60,
-            "5m": 300,
-            "15m": 900,
-            "30m": 1800,
-            "1h": 3600,
-            "4h": 14400,
-            "1d": 86400
-        }
-        interval_seconds = interval_map.get(interval, 1)  # default to 1s
-        
-        # Calculate time_ago in ISO format
-        time_ago = (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%SZ")
-        
-        query = """query ($token: String, $base: String, $dataset: dataset_arg_enum, $time_ago: DateTime, $interval: Int) {
+INTERVAL_SECONDS = {
+    "1s": 1,  # 1 second
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "1h": 3600,
+    "4h": 14400,
+    "1d": 86400
+}
+
+OHLCV_QUERY = """query ($token: String, $base: String, $dataset: dataset_arg_enum, $time_ago: DateTime, $interval: Int) {
   Solana(dataset: $dataset) {
     DEXTradeByTokens(
       orderBy: {ascendingByField: "Block_Time"}
@@ -77,57 +51,157 @@ class BitqueryClient:
   }
 }
 """
+
+# Same query bounded on both sides, for fetching disjoint [since, till) windows
+OHLCV_WINDOW_QUERY = OHLCV_QUERY.replace(
+    "$interval: Int)", "$interval: Int, $till: DateTime)"
+).replace(
+    "Block: {Time: {after: $time_ago}}", "Block: {Time: {after: $time_ago, before: $till}}"
+)
+
+
+def _iso(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def build_ohlcv_payload(token_address, base_address, interval="1s", days_ago=1, since=None, till=None):
+    """
+    GraphQL payload for the OHLCV query
+
+    By default covers the last days_ago days; pass since and till (datetimes)
+    to fetch one bounded window instead.
+    """
+    # Calculate time_ago in ISO format
+    if since is None:
+        # Whole minutes, so repeated calls within a minute share a cache key
+        since = (datetime.now() - timedelta(days=days_ago)).replace(second=0, microsecond=0)
+    time_ago = _iso(since)
+    variables = {
+        "token": token_address,
+        "base": base_address,
+        "dataset": "archive",
+        "time_ago": time_ago,
+        "interval": INTERVAL_SECONDS.get(interval, 1)  # default to 1s
+    }
+    if till is None:
+        return {"query": OHLCV_QUERY, "variables": variables}
+    variables["till"] = _iso(till)
+    return {"query": OHLCV_WINDOW_QUERY, "variables": variables}
+
+
+def response_error(response_data):
+    """Why a response has no usable result (its GraphQL errors, or no data), or None if it is usable"""
+    if not isinstance(response_data, dict):
+        return f"Unexpected response: {str(response_data)[:200]}"
+    if response_data.get('errors'):
+        return f"GraphQL errors: {str(response_data['errors'])[:500]}"
+    if not response_data.get('data'):
+        return "Response has no data"
+    return None
+
+
+def parse_ohlcv_response(response_data, symbol=""):
+    """Turn a DEXTradeByTokens response into an OHLCV DataFrame (empty if there is nothing usable)"""
+    if 'data' in response_data and response_data['data'] and 'Solana' in response_data['data']:
+        trades = response_data['data']['Solana']['DEXTradeByTokens']
+        if not trades:
+            logger.warning(f"No trades found for {symbol}")
+            return pd.DataFrame()  # Return empty DataFrame instead of None
         
-        variables = {
-            "token": token_address,
-            "base": base_address,
-            "dataset": "archive",  
-            "time_ago": time_ago,
-            "interval": interval_seconds
-        }
+        df = pd.DataFrame({
+            'timestamp': [trade['Block']['Time'] for trade in trades],
+            'open': [float(trade['open']) for trade in trades],
+            'high': [float(trade['max']) for trade in trades],
+            'low': [float(trade['min']) for trade in trades],
+            'close': [float(trade['close']) for trade in trades],
+            'volume': [float(trade['volume']) for trade in trades]
+        })
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df
+    
+    logger.error(f"Invalid response format: {str(response_data)[:500]}")
+    return pd.DataFrame()
+
+
+class BitqueryClient:
+    def __init__(self, url="https://streaming.bitquery.io/eap", pool_size=10, timeout=(5, 60), api_key=None,
+                 cache=None):
+        """
+        url: GraphQL endpoint; point it at a local stub server for tests and benchmarks
+        pool_size: keep-alive connections kept open for concurrent callers of this client
+        timeout: (connect, read) seconds for each request
+        cache: ResponseCache for responses; defaults to ResponseCache.from_env(), which is
+               None unless BITQUERY_CACHE_DIR is set
+        """
+        self.cache = cache if cache is not None else ResponseCache.from_env()
+        self.api_key = api_key or os.getenv('BIT_3_TOKEN')
+        # Offline replay never reaches the API, so it needs no key
+        if self.cache is not None and self.cache.offline:
+            self.api_key = self.api_key or 'offline'
+        if not self.api_key:
+            raise ValueError("API key is required. Please set BIT_3_TOKEN in your .env file")
         
-        payload = {
-            "query": query,
-            "variables": variables
+        self.url = url
+        self.timeout = timeout
+        self.headers = {
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Authorization": f"Bearer {self.api_key}"
         }
         
+        # One session for the client's lifetime, so the TCP and TLS handshakes
+        # are paid once per pooled connection instead of once per request
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def close(self):
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def post_query(self, payload):
+        """POST a GraphQL payload and return the decoded JSON (gzip is decoded by requests)"""
+        if self.cache is not None:
+            cached = self.cache.get(payload)
+            if cached is not None:
+                return cached
+        
+        response = self.session.post(self.url, data=json.dumps(payload), timeout=self.timeout)
+        response.raise_for_status()
+        response_data = response.json()
+        
+        if self.cache is not None:
+            self.cache.put(payload, response_data)
+        return response_data
+    
+    def fetch_ohlcv_data(self, token_address, base_address, symbol="", interval="1s", days_ago=1,
+                         since=None, till=None):
+        """
+        Fetch OHLCV data for a given token pair
+        
+        Args:
+            token_address (str): Token address
+            base_address (str): Base token address
+            symbol (str): Symbol for logging
+            interval (str): Time interval for the data (default "1s" for 1 second)
+            days_ago (int): Number of days of historical data to fetch (default 1 to avoid overwhelming with seconds data)
+            since, till (datetime): Fetch the closed window [since, till) instead; closed
+                                    historical windows are cached indefinitely
+        """
+        logger.info(f"Fetching {days_ago} days of {interval} data for {symbol}...")
+        payload = build_ohlcv_payload(token_address, base_address, interval, days_ago, since, till)
+        
         try:
-            conn = http.client.HTTPSConnection(self.endpoint)
-            conn.request("POST", "/eap", json.dumps(payload), self.headers)
-            
-            response = conn.getresponse()
-            data = response.read()
-            response_data = json.loads(data.decode('utf-8'))
-            
-            logger.info(f"Full API Response: {json.dumps(response_data, indent=2)}")
-            
-            if 'data' in response_data and 'Solana' in response_data['data']:
-                trades = response_data['data']['Solana']['DEXTradeByTokens']
-                if not trades:
-                    logger.warning(f"No trades found for {symbol}")
-                    return pd.DataFrame()  # Return empty DataFrame instead of None
-                
-                # Process the trades data
-                processed_trades = []
-                for trade in trades:
-                    processed_trade = {
-                        'timestamp': trade['Block']['Time'],
-                        'open': float(trade['open']),
-                        'high': float(trade['max']),
-                        'low': float(trade['min']),
-                        'close': float(trade['close']),
-                        'volume': float(trade['volume'])
-                    }
-                    processed_trades.append(processed_trade)
-                
-                df = pd.DataFrame(processed_trades)
-                if not df.empty:
-                    df['timestamp'] = pd.to_datetime(df['timestamp'])
-                
-                return df
-            else:
-                logger.error(f"Invalid response format: {response_data}")
-                return pd.DataFrame()
+            response_data = self.post_query(payload)
+            logger.debug(f"Full API Response: {json.dumps(response_data, indent=2)}")
+            return parse_ohlcv_response(response_data, symbol)
                 
         except Exception as e:
             logger.error(f"Error fetching data: {str(e)}")
@@ -167,6 +241,8 @@ def main():
             
     except Exception as e:
         logger.error(f"Error fetching data: {str(e)}")
+    finally:
+        client.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
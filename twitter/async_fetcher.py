@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from collections import namedtuple
+import aiohttp
+import pandas as pd
+from BITQUERY_API import build_ohlcv_payload, parse_ohlcv_response, response_error
+from response_cache import ResponseCache
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# One request: a token pair over the window [since, till)
+FetchJob = namedtuple('FetchJob', ['token_address', 'base_address', 'symbol', 'interval', 'since', 'till'])
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        """
+        Async token bucket shared by every request of a fetcher
+
+        rate: tokens added per second, i.e. the sustained API quota
+        capacity: largest burst; defaults to one second of quota
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RetryableError(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AsyncOhlcvFetcher:
+    def __init__(self, url="https://streaming.bitquery.io/eap", api_key=None, rate=5.0, burst=None,
+                 concurrency=8, max_retries=5, backoff=1.0, timeout=60, cache=None):
+        """
+        Fetch many (token, window) OHLCV queries concurrently
+
+        rate / burst: token bucket matching the API quota, in requests per second
+        concurrency: requests in flight at once, also the connection pool size
+        max_retries: attempts after the first for 429, 5xx, network and GraphQL errors
+        backoff: base seconds of exponential backoff when no Retry-After is given
+        cache: ResponseCache consulted before the limiter, so hits cost no quota; defaults
+               to ResponseCache.from_env()
+        """
+        self.url = url
+        self.cache = cache if cache is not None else ResponseCache.from_env()
+        self.api_key = api_key or os.getenv('BIT_3_TOKEN')
+        if self.cache is not None and self.cache.offline:
+            self.api_key = self.api_key or 'offline'
+        if not self.api_key:
+            raise ValueError("API key is required. Please set BIT_3_TOKEN in your .env file")
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.stats = {'requests': 0, 'cache_hits': 0, 'retries': 0, 'succeeded': 0, 'failed': 0, 'rows': 0}
+
+    async def post_query(self, session, limiter, payload):
+        """
+        POST one payload through the cache and limiter
+
+        Raises RetryableError for 429, 5xx, network errors and 200 responses carrying
+        GraphQL errors or no data, so a failed query is never mistaken for an empty window.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(payload)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                return cached
+
+        await limiter.acquire()
+        self.stats['requests'] += 1
+        try:
+            async with session.post(self.url, data=json.dumps(payload)) as response:
+                if response.status in RETRY_STATUSES:
+                    retry_after = response.headers.get('Retry-After')
+                    raise RetryableError(
+                        f"HTTP {response.status}", float(retry_after) if retry_after else None
+                    )
+                response.raise_for_status()
+                response_data = await response.json(content_type=None)
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+            raise RetryableError(f"{type(e).__name__}: {e}")
+
+        error = response_error(response_data)
+        if error:
+            raise RetryableError(error)
+
+        if self.cache is not None:
+            self.cache.put(payload, response_data)
+        return response_data
+
+    def open_session(self):
+        """aiohttp session whose connection pool is capped at concurrency"""
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self.api_key}"
+            },
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+
+    def make_limiter(self):
+        return TokenBucket(self.rate, self.burst)
+
+    def _retry_delay(self, attempt, error):
+        if error.retry_after is not None:
+            return error.retry_after
+        # Full jitter keeps retries from many workers from arriving together
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    async def _worker(self, session, limiter, queue, sink, pending, failed):
+        while True:
+            job, attempt = await queue.get()
+            try:
+                payload = build_ohlcv_payload(
+                    job.token_address, job.base_address, job.interval, since=job.since, till=job.till
+                )
+                df = parse_ohlcv_response(await self.post_query(session, limiter, payload), job.symbol)
+                self.stats['succeeded'] += 1
+                self.stats['rows'] += len(df)
+                sink(job, df)
+                pending.discard(job)
+            except RetryableError as e:
+                if attempt < self.max_retries:
+                    self.stats['retries'] += 1
+                    delay = self._retry_delay(attempt, e)
+                    logger.debug(f"Retrying {job.symbol} {job.since} in {delay:.1f}s after {e}")
+                    # Back onto the queue after the delay, without holding a worker slot meanwhile
+                    asyncio.get_running_loop().call_later(delay, queue.put_nowait, (job, attempt + 1))
+                else:
+                    logger.error(f"Giving up on {job.symbol} {job.since}-{job.till} after {attempt + 1} attempts: {e}")
+                    self.stats['failed'] += 1
+                    failed.append(job)
+                    pending.discard(job)
+            except Exception as e:
+                logger.error(f"Error fetching {job.symbol} {job.since}-{job.till}: {e}")
+                self.stats['failed'] += 1
+                failed.append(job)
+                pending.discard(job)
+            finally:
+                queue.task_done()
+
+    async def run(self, jobs, sink):
+        """
+        Fetch every job, calling sink(job, df) as each result arrives
+
+        Returns the jobs that still failed after all retries.
+        """
+        jobs = list(jobs)
+        pending = set(jobs)
+        failed = []
+        queue = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait((job, 0))
+
+        limiter = self.make_limiter()
+        async with self.open_session() as session:
+            workers = [
+                asyncio.create_task(self._worker(session, limiter, queue, sink, pending, failed))
+                for _ in range(self.concurrency)
+            ]
+            # Delayed retries are not in the queue yet, so wait on the pending set too
+            while pending:
+                await queue.join()
+                if pending:
+                    await asyncio.sleep(0.05)
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        logger.info(
+            f"Fetched {self.stats['succeeded']}/{len(jobs)} windows, {self.stats['rows']} rows, "
+            f"{self.stats['cache_hits']} from cache, {self.stats['retries']} retries, {self.stats['failed']} failed"
+        )
+        return failed
+
+    def fetch(self, jobs, sink):
+        """Blocking wrapper around run() for scripts"""
+        return asyncio.run(self.run(jobs, sink))
+
+
+class CsvSink:
+    def __init__(self, output_dir, filename="{symbol}_{address}.csv", append=False):
+        """
+        Append each fetched window to its token's CSV as soon as it arrives
+
+        filename: template with {symbol} and {address}; tickers are not unique, so
+                  keep {address} in it when several tokens share the directory
+        append: keep rows from earlier runs (resumable backfills) instead of
+                truncating each file on its first write of this run
+        finalize() then sorts and de-duplicates each file written this run.
+        """
+        self.output_dir = output_dir
+        self.filename = filename
+        self.append = append
+        self.paths = set()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def path(self, job):
+        return os.path.join(self.output_dir, self.filename.format(symbol=job.symbol.lower(), address=job.token_address))
+
+    def __call__(self, job, df):
+        if df.empty:
+            return
+        path = self.path(job)
+        if path in self.paths or (self.append and os.path.exists(path) and os.path.getsize(path) > 0):
+            df.to_csv(path, mode='a', header=False, index=False)
+        else:
+            # Truncate on the first write of this run so reruns start clean
+            df.to_csv(path, mode='w', header=True, index=False)
+        self.paths.add(path)
+
+    def finalize(self):
+        for path in self.paths:
+            df = pd.read_csv(path)
+            # Rows are appended in fetch order, so the last copy of a bar is the freshest
+            # (a refetched trailing window replaces the partial bars of the last run)
+            df = df.drop_duplicates(subset='timestamp', keep='last').sort_values('timestamp')
+            df.to_csv(path, index=False)
+            logger.info(f"Saved {len(df)} records to {path}")
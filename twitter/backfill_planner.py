@@ -0,0 +1,143 @@
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+from async_fetcher import FetchJob
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def align_down(moment, window):
+    """Start of the window-sized grid cell containing moment (grid anchored at the Unix epoch)"""
+    return moment - (moment - EPOCH) % window
+
+
+def plan_windows(start, end, window=timedelta(days=1)):
+    """
+    Split [start, end) into disjoint windows on a fixed grid
+
+    start is rounded down to the grid, which does not depend on when the run
+    happens, so reruns produce the same windows and progress (and cache keys)
+    line up. Only the last window is clipped, to end.
+    """
+    windows = []
+    cursor = align_down(start, window)
+    while cursor < end:
+        windows.append((cursor, min(cursor + window, end)))
+        cursor += window
+    return windows
+
+
+class BackfillProgress:
+    def __init__(self, db_path):
+        """Completed backfill windows, one row per (token, base, interval, window_start)"""
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS backfill_progress (
+            token_address TEXT NOT NULL,
+            base_address TEXT NOT NULL,
+            interval TEXT NOT NULL,
+            window_start TEXT NOT NULL,
+            window_end TEXT NOT NULL,
+            rows INTEGER,
+            completed_at TEXT,
+            PRIMARY KEY (token_address, base_address, interval, window_start)
+        )
+        ''')
+        self.conn.commit()
+
+    def completed(self, token_address, base_address, interval):
+        """{window_start: window_end} of finished windows for one pair"""
+        rows = self.conn.execute(
+            '''SELECT window_start, window_end FROM backfill_progress
+               WHERE token_address = ? AND base_address = ? AND interval = ?''',
+            (token_address, base_address, interval)
+        ).fetchall()
+        return {datetime.fromisoformat(s): datetime.fromisoformat(e) for s, e in rows}
+
+    def mark_done(self, job, rows):
+        self.conn.execute(
+            '''INSERT INTO backfill_progress
+               (token_address, base_address, interval, window_start, window_end, rows, completed_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (token_address, base_address, interval, window_start)
+               DO UPDATE SET window_end = excluded.window_end, rows = excluded.rows,
+                             completed_at = excluded.completed_at''',
+            (job.token_address, job.base_address, job.interval, job.since.isoformat(),
+             job.till.isoformat(), rows, datetime.utcnow().isoformat())
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def plan_backfill(progress, tokens, base_address, interval, start, end, window=timedelta(days=1)):
+    """
+    FetchJobs for the windows of [start, end) not yet recorded as complete
+
+    tokens: iterable of (token_address, symbol)
+    A recorded window only counts if it covers the planned one, so a clipped
+    trailing window from an earlier run is fetched again once it has grown.
+    """
+    windows = plan_windows(start, end, window)
+    jobs = []
+    for token_address, symbol in tokens:
+        if token_address == base_address:
+            continue
+        done = progress.completed(token_address, base_address, interval)
+        for since, till in windows:
+            if done.get(since, EPOCH) >= till:
+                continue
+            jobs.append(FetchJob(token_address, base_address, symbol, interval, since, till))
+    return jobs
+
+
+class ProgressSink:
+    def __init__(self, sink, progress, settle=timedelta(hours=1), now=None):
+        """
+        Wrap a result sink so each window is recorded only after it has been stored
+
+        Only call it with the result of a valid response (data and no GraphQL
+        errors); failed fetches must never reach it, or their windows would be
+        recorded as done and not fetched again. A valid response with no trades
+        is recorded with rows=0 and listed in empty, apart from the stored windows.
+        Windows ending within settle of now may still receive trades, so they are
+        stored but left unrecorded and fetched again next run.
+        """
+        self.sink = sink
+        self.progress = progress
+        self.cutoff = (now or datetime.utcnow()) - settle
+        self.stored = []
+        self.empty = []
+
+    def __call__(self, job, df):
+        self.sink(job, df)
+        (self.empty if df.empty else self.stored).append(job)
+        if job.till <= self.cutoff:
+            self.progress.mark_done(job, len(df))
+
+
+def backfill(fetcher, sink, progress, tokens, base_address, interval, days, window=timedelta(days=1), now=None):
+    """
+    Fetch the missing windows of the last days of history for every token
+
+    Safe to rerun after a crash: finished windows are skipped, and a window
+    interrupted between storage and bookkeeping is fetched again (sinks
+    de-duplicate on timestamp). Windows whose fetch failed, including GraphQL
+    error responses, stay unrecorded. Returns the jobs that failed.
+    """
+    now = (now or datetime.utcnow()).replace(second=0, microsecond=0)
+    jobs = plan_backfill(progress, tokens, base_address, interval, now - timedelta(days=days), now, window)
+    logger.info(f"Backfill plan: {len(jobs)} missing windows")
+    if not jobs:
+        return []
+    progress_sink = ProgressSink(sink, progress, now=now)
+    failed = fetcher.fetch(jobs, progress_sink)
+    logger.info(
+        f"Backfill: {len(progress_sink.stored)} windows stored, {len(progress_sink.empty)} valid but empty, "
+        f"{len(failed)} failed and left for the next run"
+    )
+    return failed
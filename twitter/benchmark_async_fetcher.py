@@ -0,0 +1,64 @@
+import sys
+import time
+import logging
+from datetime import datetime, timedelta
+from BITQUERY_API import BitqueryClient, build_ohlcv_payload, parse_ohlcv_response
+from async_fetcher import AsyncOhlcvFetcher, FetchJob
+from stub_bitquery_server import StubBitqueryServer
+
+SOL_ADDRESS = "So11111111111111111111111111111111111111112"
+
+
+def make_jobs(num_tokens, days):
+    now = datetime(2024, 1, 31)
+    return [
+        FetchJob(f"token{t}", SOL_ADDRESS, f"TOKEN{t}", "1m",
+                 now - timedelta(days=day + 1), now - timedelta(days=day))
+        for t in range(num_tokens) for day in range(days)
+    ]
+
+
+def run_serial(server, jobs):
+    """The old loop without its sleeps: one request at a time over a pooled client"""
+    rows = 0
+    with BitqueryClient(url=server.url, api_key='stub') as client:
+        for job in jobs:
+            payload = build_ohlcv_payload(job.token_address, job.base_address, job.interval,
+                                          since=job.since, till=job.till)
+            rows += len(parse_ohlcv_response(client.post_query(payload), job.symbol))
+    return rows
+
+
+def run_async(server, jobs, rate, concurrency):
+    results = []
+    fetcher = AsyncOhlcvFetcher(url=server.url, api_key='stub', rate=rate, concurrency=concurrency, backoff=0.2)
+    failed = fetcher.fetch(jobs, lambda job, df: results.append(len(df)))
+    return sum(results), fetcher.stats, failed
+
+
+def benchmark(num_tokens=25, days=8, latency=0.2, quota=40, bars=200):
+    jobs = make_jobs(num_tokens, days)
+    print(f"{len(jobs)} windows, {latency * 1000:.0f} ms latency, stub quota {quota} req/s, {bars} bars each")
+
+    with StubBitqueryServer(bars=bars, latency=latency, quota=quota) as server:
+        start = time.perf_counter()
+        rows = run_serial(server, jobs)
+        elapsed = time.perf_counter() - start
+        print(f"serial                       {elapsed:7.2f}s {len(jobs) / elapsed:7.1f} windows/s rows={rows}")
+
+        # Limiter at the quota, and 50% over it to exercise the 429 retry path
+        for rate, concurrency in [(quota, 16), (quota * 1.5, 16)]:
+            throttled = server.throttled
+            start = time.perf_counter()
+            rows, stats, failed = run_async(server, jobs, rate, concurrency)
+            elapsed = time.perf_counter() - start
+            print(f"async rate={rate:<5g} conc={concurrency:<3} {elapsed:7.2f}s {len(jobs) / elapsed:7.1f} windows/s "
+                  f"rows={rows} 429s={server.throttled - throttled} retries={stats['retries']} failed={len(failed)}")
+
+
+if __name__ == "__main__":
+    # Usage: python benchmark_async_fetcher.py [num_tokens] [days] [latency_ms] [quota]
+    logging.getLogger('async_fetcher').setLevel(logging.WARNING)
+    args = [float(arg) for arg in sys.argv[1:]]
+    num_tokens, days, latency_ms, quota = args + [25, 8, 200, 40][len(args):]
+    benchmark(int(num_tokens), int(days), latency_ms / 1000, quota)
@@ -0,0 +1,55 @@
+import sys
+import json
+import time
+import http.client
+from urllib.parse import urlsplit
+from BITQUERY_API import BitqueryClient, build_ohlcv_payload, parse_ohlcv_response
+from stub_bitquery_server import StubBitqueryServer
+
+SOL_ADDRESS = "So11111111111111111111111111111111111111112"
+TOKEN_ADDRESS = "BP8RUdhLKBL2vgVXc3n7oTSZKWaQVbD8S6QcPaMVBAPo"
+
+
+def fetch_new_connection(url, headers, payload):
+    """The previous fetch_ohlcv_data: a fresh connection per request, uncompressed response"""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port)
+    conn.request("POST", parts.path, json.dumps(payload), headers)
+    return json.loads(conn.getresponse().read().decode('utf-8'))
+
+
+def run(label, fetch, num_requests):
+    payload = build_ohlcv_payload(TOKEN_ADDRESS, SOL_ADDRESS, interval="1m")
+    fetch(payload)  # warm-up
+    start = time.perf_counter()
+    for _ in range(num_requests):
+        parse_ohlcv_response(fetch(payload))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {num_requests / elapsed:8.1f} requests/sec")
+    return num_requests / elapsed
+
+
+def benchmark(num_requests=300, bars=500, latency=0.0, handshake_latency=0.0):
+    """
+    Requests/sec of per-request connections vs the pooled client against the stub
+
+    On loopback a new connection is nearly free, so handshake_latency models the
+    TCP + TLS setup to the real endpoint.
+    """
+    print(f"bars={bars} latency={latency * 1000:.0f} ms handshake={handshake_latency * 1000:.0f} ms")
+    with StubBitqueryServer(bars=bars, latency=latency, handshake_latency=handshake_latency) as server:
+        headers = {"Content-Type": "application/json", "Authorization": "Bearer stub"}
+        run("new connection", lambda p: fetch_new_connection(server.url, headers, p), num_requests)
+        before = server.connections
+
+        with BitqueryClient(url=server.url, api_key='stub') as client:
+            run("pooled session (gzip)", client.post_query, num_requests)
+        print(f"TCP connections: {before} per-request, {server.connections - before} pooled")
+
+
+if __name__ == "__main__":
+    # Usage: python benchmark_bitquery_client.py [num_requests] [bars_per_response] [handshake_ms]
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    bars = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    handshake_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 50
+    benchmark(num_requests, bars, handshake_latency=handshake_ms / 1000)
@@ -0,0 +1,123 @@
+import sys
+import time
+import shutil
+import logging
+import tempfile
+from datetime import datetime, timedelta
+from requests.exceptions import RequestException
+from BITQUERY_API import BitqueryClient, build_ohlcv_payload, parse_ohlcv_response, response_error
+from async_fetcher import AsyncOhlcvFetcher, FetchJob
+from jupiter_direct_api import JupiterDirectAPI
+from response_cache import ResponseCache
+from stub_bitquery_server import StubBitqueryServer
+
+SOL_ADDRESS = "So11111111111111111111111111111111111111112"
+
+# Stub settings per scenario; every scenario runs every workload
+SCENARIOS = {
+    'clean': {'latency': 0.05},
+    'jittery': {'latency': 0.05, 'jitter': 0.15},
+    'throttled': {'latency': 0.05, 'quota': 20},
+    'flaky': {'latency': 0.05, 'error_rate': 0.05, 'graphql_error_rate': 0.02},
+}
+
+
+def make_jobs(num_tokens, days):
+    now = datetime(2024, 1, 31)
+    return [
+        FetchJob(f"token{t}", SOL_ADDRESS, f"TOKEN{t}", "1m",
+                 now - timedelta(days=day + 1), now - timedelta(days=day))
+        for t in range(num_tokens) for day in range(days)
+    ]
+
+
+def bitquery_serial(server, jobs):
+    """One window at a time through the pooled synchronous client"""
+    rows = failed = 0
+    with BitqueryClient(url=server.url, api_key='stub') as client:
+        # Measure the network path even when BITQUERY_CACHE_DIR is set
+        client.cache = None
+        for job in jobs:
+            payload = build_ohlcv_payload(job.token_address, job.base_address, job.interval,
+                                          since=job.since, till=job.till)
+            try:
+                response_data = client.post_query(payload)
+            except RequestException:
+                failed += 1
+                continue
+            if response_error(response_data):
+                failed += 1
+                continue
+            rows += len(parse_ohlcv_response(response_data, job.symbol))
+    return len(jobs), rows, failed
+
+
+def async_fetcher(server, jobs, rate=100.0, concurrency=16, cache=None):
+    """Every window concurrently, under the limiter and retry queue"""
+    results = []
+    fetcher = AsyncOhlcvFetcher(url=server.url, api_key='stub', rate=rate, concurrency=concurrency, backoff=0.2)
+    fetcher.cache = cache
+    failed = fetcher.fetch(jobs, lambda job, df: results.append(len(df)))
+    return len(jobs), sum(results), len(failed)
+
+
+def jupiter_prices(server, num_ids):
+    """One price snapshot for num_ids tokens in batched requests"""
+    addresses = [f"mint{i:05d}" for i in range(num_ids)]
+    client = JupiterDirectAPI(base_url=server.price_url)
+    try:
+        df = client.get_prices(addresses)
+    finally:
+        client.close()
+    return num_ids, len(df), num_ids - len(df)
+
+
+def record(jobs, cache_dir):
+    """Fetch jobs from a clean stub through a ResponseCache, leaving recordings in cache_dir"""
+    with StubBitqueryServer(bars=200) as server:
+        async_fetcher(server, jobs, cache=ResponseCache(cache_dir))
+
+
+def run(label, server, workload, *args):
+    requests, throttled, errors = server.requests, server.throttled, server.errors
+    start = time.perf_counter()
+    items, rows, failed = workload(server, *args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:7.2f}s {items / elapsed:8.1f} items/s rows={rows:<7} "
+          f"requests={server.requests - requests:<5} 429s={server.throttled - throttled:<4} "
+          f"errors={server.errors - errors:<4} failed={failed}")
+
+
+def benchmark(num_tokens=10, days=20, serial_windows=40, num_ids=2000):
+    """
+    Throughput of each fetch path under each stub scenario, then a replay of recorded responses
+
+    items are windows for the OHLCV clients and token ids for the Jupiter client.
+    """
+    jobs = make_jobs(num_tokens, days)
+    print(f"{len(jobs)} OHLCV windows ({serial_windows} serial), {num_ids} Jupiter ids")
+    for name, settings in SCENARIOS.items():
+        print(f"-- {name}: {settings}")
+        with StubBitqueryServer(bars=200, **settings) as server:
+            run("bitquery serial", server, bitquery_serial, jobs[:serial_windows])
+            rate = settings.get('quota') or 100.0
+            run(f"async rate={rate:g} conc=16", server, async_fetcher, jobs, rate)
+            run("jupiter batched prices", server, jupiter_prices, num_ids)
+
+    cache_dir = tempfile.mkdtemp(prefix='bitquery_replay_')
+    try:
+        record(jobs, cache_dir)
+        print(f"-- replay: recordings from {cache_dir}")
+        with StubBitqueryServer(latency=0.05, replay_dir=cache_dir, replay_only=True) as server:
+            run("async replay", server, async_fetcher, jobs)
+            print(f"{server.replayed} responses replayed")
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    # Usage: python benchmark_fetch_suite.py [num_tokens] [days] [serial_windows] [jupiter_ids]
+    for name in ('async_fetcher', 'jupiter_direct_api', 'BITQUERY_API'):
+        logging.getLogger(name).setLevel(logging.CRITICAL)
+    args = [int(arg) for arg in sys.argv[1:]]
+    benchmark(*args)
@@ -0,0 +1,185 @@
+import os
+import sys
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from collections import namedtuple
+import pandas as pd
+from BITQUERY_API import INTERVAL_SECONDS, build_ohlcv_payload, parse_ohlcv_response
+from async_fetcher import AsyncOhlcvFetcher, RetryableError
+from data_collector import OhlcvStore
+from token_registry import DEFAULT_PATHS, get_registry
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SOL_ADDRESS = "So11111111111111111111111111111111111111112"
+
+# A pair polled every INTERVAL_SECONDS[interval] seconds for bars of that interval
+Pair = namedtuple('Pair', ['token_address', 'base_address', 'symbol', 'interval'])
+
+
+def pair_key(pair):
+    return pair.token_address, pair.base_address
+
+def load_intervals(paths):
+    """{address: interval} from the files that carry their own 'interval' column"""
+    intervals = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        df = pd.read_csv(path, nrows=0)
+        if 'interval' not in df.columns:
+            continue
+        df = pd.read_csv(path, dtype=str).rename(columns={'MintAddress': 'address'})
+        for address, interval in zip(df['address'], df['interval']):
+            if interval in INTERVAL_SECONDS:
+                intervals.setdefault(address, interval)
+    return intervals
+
+
+def load_pairs(paths=DEFAULT_PATHS, base_address=SOL_ADDRESS, hot_symbols=(),
+               hot_interval='1s', default_interval='5m'):
+    """
+    Pairs against base_address for every token in the given CSVs, first file wins on duplicates
+
+    A file may carry its own 'interval' column; otherwise tokens in hot_symbols
+    get hot_interval and the long tail default_interval.
+    """
+    hot = {symbol.upper() for symbol in hot_symbols}
+    intervals = load_intervals(paths)
+    pairs = []
+    for token in get_registry(paths):
+        if token.address == base_address:
+            continue
+        interval = intervals.get(token.address)
+        if interval is None:
+            interval = hot_interval if token.symbol.upper() in hot else default_interval
+        pairs.append(Pair(token.address, base_address, token.symbol, interval))
+    logger.info(f"Loaded {len(pairs)} pairs from {', '.join(paths)}")
+    return pairs
+
+
+class CollectorDaemon:
+    def __init__(self, pairs, db_path='collected_data/collector.db', rate=5.0, concurrency=16,
+                 lookback=timedelta(hours=1), url="https://streaming.bitquery.io/eap", api_key=None):
+        """
+        Poll many pairs, each on its own cadence, into one OhlcvStore
+
+        rate / concurrency: one token bucket and one connection pool shared by all pairs
+        lookback: history fetched for a pair with nothing stored yet
+        A pair whose poll overruns its interval does not queue up missed ticks: they
+        are coalesced into the next poll, which fetches everything since the pair's
+        high-water mark anyway.
+        """
+        self.pairs = pairs
+        self.store = OhlcvStore(db_path)
+        self.fetcher = AsyncOhlcvFetcher(url=url, api_key=api_key, rate=rate, concurrency=concurrency)
+        # Live polls ask for windows reaching now; a cached answer would just be stale
+        self.fetcher.cache = None
+        self.lookback = lookback
+        # Keyed by (token, base): tickers are not unique across the token lists
+        self.high_water_marks = {
+            pair_key(pair): self.store.high_water_mark(pair.token_address, pair.base_address) for pair in pairs
+        }
+        self.stats = {pair_key(pair): {'polls': 0, 'rows': 0, 'coalesced': 0, 'errors': 0} for pair in pairs}
+
+    async def poll(self, session, limiter, pair):
+        """Fetch and store bars newer than the pair's high-water mark"""
+        mark = self.high_water_marks[pair_key(pair)]
+        # Re-request the bar at the mark, which may still have been forming
+        since = mark - timedelta(seconds=1) if mark else datetime.utcnow() - self.lookback
+        payload = build_ohlcv_payload(pair.token_address, pair.base_address, pair.interval, since=since)
+        df = parse_ohlcv_response(await self.fetcher.post_query(session, limiter, payload), pair.symbol)
+        if df.empty:
+            return 0
+
+        df['collected_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        timestamps = self.store.upsert(pair.token_address, pair.base_address, pair.symbol, df)
+        latest = datetime.strptime(timestamps.max(), '%Y-%m-%dT%H:%M:%SZ')
+        self.high_water_marks[pair_key(pair)] = max(latest, mark or latest)
+        return len(df)
+
+    async def run_pair(self, session, limiter, pair, offset=0.0):
+        period = INTERVAL_SECONDS[pair.interval]
+        stats = self.stats[pair_key(pair)]
+        loop = asyncio.get_running_loop()
+        # Spread first polls over the period so pairs sharing a cadence do not all fire at once
+        next_tick = loop.time() + offset * period
+
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            try:
+                stats['rows'] += await self.poll(session, limiter, pair)
+            except RetryableError as e:
+                # The next tick fetches from the same mark, so nothing is lost
+                stats['errors'] += 1
+                logger.debug(f"{pair.symbol} ({pair.token_address}): {e}, retrying next tick")
+            except Exception as e:
+                stats['errors'] += 1
+                logger.error(f"{pair.symbol} ({pair.token_address}): {e}")
+            stats['polls'] += 1
+
+            next_tick += period
+            now = loop.time()
+            if now > next_tick:
+                # Fell behind: the overdue ticks collapse into one poll right away,
+                # then the pair continues on its original grid
+                missed = int((now - next_tick) // period)
+                stats['coalesced'] += missed
+                next_tick += missed * period
+
+    async def report(self, every):
+        while True:
+            await asyncio.sleep(every)
+            totals = {key: sum(s[key] for s in self.stats.values()) for key in ('polls', 'rows', 'coalesced', 'errors')}
+            logger.info(
+                f"{len(self.pairs)} pairs: {totals['polls']} polls, {totals['rows']} rows, "
+                f"{totals['coalesced']} ticks coalesced, {totals['errors']} errors, "
+                f"{self.fetcher.stats['requests']} requests"
+            )
+
+    async def run(self, duration=None, report_every=60):
+        """Poll until cancelled, or for duration seconds"""
+        limiter = self.fetcher.make_limiter()
+        async with self.fetcher.open_session() as session:
+            tasks = [
+                asyncio.create_task(self.run_pair(session, limiter, pair, i / len(self.pairs)))
+                for i, pair in enumerate(self.pairs)
+            ]
+            tasks.append(asyncio.create_task(self.report(report_every)))
+            try:
+                if duration is None:
+                    await asyncio.gather(*tasks)
+                else:
+                    await asyncio.sleep(duration)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self.store.close()
+
+
+def main():
+    # Usage: python collector_daemon.py [HOT_SYMBOL,HOT_SYMBOL,...]
+    hot_symbols = sys.argv[1].split(',') if len(sys.argv) > 1 else ()
+    pairs = load_pairs(hot_symbols=hot_symbols)
+    if not pairs:
+        logger.error("No pairs found in active_tokens.csv or jupiter.csv")
+        return
+    os.makedirs('collected_data', exist_ok=True)
+
+    daemon = CollectorDaemon(pairs)
+    logger.info(f"Collecting {len(pairs)} pairs ({sum(p.interval == '1s' for p in pairs)} at 1s)")
+    try:
+        asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        logger.info("Collector stopped by user")
+
+
+if __name__ == "__main__":
+    main()
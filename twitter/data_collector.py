@@ -1,7 +1,8 @@
 import os
 import time
+import sqlite3
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 from BITQUERY_API import BitqueryClient
 
@@ -12,48 +13,157 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+class OhlcvStore:
+    def __init__(self, db_path):
+        """
+        Collected bars for any number of pairs, keyed and indexed by (token, base, timestamp)
+
+        Tickers are not unique (thousands of listed tokens share one), so the symbol
+        is stored as a plain column. A table from the earlier symbol-keyed layout is
+        renamed to ohlcv_bars_by_symbol; import_legacy() moves a pair's rows over.
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(ohlcv_bars)')]
+        if columns and 'token_address' not in columns:
+            self.conn.execute('ALTER TABLE ohlcv_bars RENAME TO ohlcv_bars_by_symbol')
+            logger.warning(f"Moved symbol-keyed bars in {db_path} to ohlcv_bars_by_symbol")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS ohlcv_bars (
+            token_address TEXT NOT NULL,
+            base_address TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            symbol TEXT,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume REAL,
+            collected_at TEXT,
+            PRIMARY KEY (token_address, base_address, timestamp)
+        )
+        ''')
+        self.conn.commit()
+    
+    def is_empty(self):
+        return self.conn.execute('SELECT 1 FROM ohlcv_bars LIMIT 1').fetchone() is None
+    
+    def import_legacy(self, symbol, token_address, base_address):
+        """Copy one pair's bars out of the symbol-keyed table, if there is one; returns rows copied"""
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ohlcv_bars_by_symbol'"
+        ).fetchone()
+        if not exists:
+            return 0
+        with self.conn:
+            cursor = self.conn.execute('''
+            INSERT OR IGNORE INTO ohlcv_bars
+                (token_address, base_address, timestamp, symbol, open, high, low, close, volume, collected_at)
+            SELECT ?, ?, timestamp, symbol, open, high, low, close, volume, collected_at
+            FROM ohlcv_bars_by_symbol WHERE symbol = ?
+            ''', (token_address, base_address, symbol))
+        return cursor.rowcount
+    
+    def high_water_mark(self, token_address, base_address):
+        """Latest stored bar time for the pair, read from the primary key index"""
+        row = self.conn.execute(
+            'SELECT MAX(timestamp) FROM ohlcv_bars WHERE token_address = ? AND base_address = ?',
+            (token_address, base_address)
+        ).fetchone()
+        return datetime.strptime(row[0], TIME_FORMAT) if row[0] else None
+    
+    def upsert(self, token_address, base_address, symbol, df):
+        """
+        Upsert bars; a bar seen again (the still-forming latest one) takes the newer values
+
+        Returns the stored timestamp strings, aligned with df.
+        """
+        timestamps = pd.to_datetime(df['timestamp'], utc=True).dt.strftime(TIME_FORMAT)
+        rows = zip(
+            [token_address] * len(df), [base_address] * len(df), timestamps, [symbol] * len(df),
+            df['open'], df['high'], df['low'], df['close'], df['volume'],
+            df['collected_at'] if 'collected_at' in df else [None] * len(df)
+        )
+        self.conn.executemany('''
+        INSERT INTO ohlcv_bars
+            (token_address, base_address, timestamp, symbol, open, high, low, close, volume, collected_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (token_address, base_address, timestamp) DO UPDATE SET
+            symbol = excluded.symbol, open = excluded.open, high = excluded.high, low = excluded.low,
+            close = excluded.close, volume = excluded.volume, collected_at = excluded.collected_at
+        ''', rows)
+        self.conn.commit()
+        return timestamps
+    
+    def close(self):
+        self.conn.close()
+
 class DataCollector:
-    def __init__(self):
+    def __init__(self, lookback_days=1):
+        """
+        lookback_days: history fetched on the very first poll, when the store is empty
+        """
         self.client = BitqueryClient()
         self.data_dir = 'collected_data'
         os.makedirs(self.data_dir, exist_ok=True)
+        self.lookback_days = lookback_days
         
         # SOL and FAFO addresses
         self.SOL_ADDRESS = "So11111111111111111111111111111111111111112"
         self.FAFO_ADDRESS = "BP8RUdhLKBL2vgVXc3n7oTSZKWaQVbD8S6QcPaMVBAPo"
+        self.symbol = "SOL/FAFO"
         
-        # Initialize or load existing data
+        # Bars live in an indexed SQLite store; the CSV only ever has new rows appended
         self.sol_ohlcv_file = os.path.join(self.data_dir, 'sol_fafo_history.csv')
-        self.sol_ohlcv_data = self._load_existing_data(self.sol_ohlcv_file)
-    
-    def _load_existing_data(self, file_path):
-        if os.path.exists(file_path):
+        self.store = OhlcvStore(os.path.join(self.data_dir, 'collector.db'))
+        
+        # One-off import of bars stored under the old symbol-keyed layout, or failing
+        # that of a CSV written by the old full-rewrite collector
+        if self.store.is_empty():
+            self.store.import_legacy(self.symbol, self.SOL_ADDRESS, self.FAFO_ADDRESS)
+        if self.store.is_empty() and os.path.exists(self.sol_ohlcv_file):
             try:
-                return pd.read_csv(file_path)
+                self.store.upsert(self.SOL_ADDRESS, self.FAFO_ADDRESS, self.symbol, pd.read_csv(self.sol_ohlcv_file))
             except Exception as e:
-                logger.error(f"Error loading {file_path}: {str(e)}")
-                return pd.DataFrame()
-        return pd.DataFrame()
+                logger.error(f"Error loading {self.sol_ohlcv_file}: {str(e)}")
+        self.high_water_mark = self.store.high_water_mark(self.SOL_ADDRESS, self.FAFO_ADDRESS)
     
     def collect_data(self):
         try:
-            # Fetch SOL/FAFO OHLCV data
+            # Only bars from the high-water mark on; the bar at the mark is fetched
+            # again because it may still have been forming at the last poll
+            since = None
+            if self.high_water_mark is not None:
+                since = self.high_water_mark - timedelta(seconds=1)
             df_ohlcv = self.client.fetch_ohlcv_data(
                 self.SOL_ADDRESS, 
                 self.FAFO_ADDRESS, 
-                symbol="SOL/FAFO", 
-                interval="5m"
+                symbol=self.symbol, 
+                interval="5m",
+                days_ago=self.lookback_days,
+                since=since
             )
             
             if df_ohlcv is not None and not df_ohlcv.empty:
                 # Add collection timestamp
                 df_ohlcv['collected_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 
-                # Append to historical data
-                self.sol_ohlcv_data = pd.concat([self.sol_ohlcv_data, df_ohlcv])
-                self.sol_ohlcv_data.drop_duplicates(subset=['timestamp'], keep='last', inplace=True)
-                self.sol_ohlcv_data.to_csv(self.sol_ohlcv_file, index=False)
-                logger.info(f"Updated SOL/FAFO data with {len(df_ohlcv)} new records")
+                timestamps = self.store.upsert(self.SOL_ADDRESS, self.FAFO_ADDRESS, self.symbol, df_ohlcv)
+                
+                # Append just the bars past the previous mark to the CSV export
+                if self.high_water_mark is not None:
+                    new_rows = df_ohlcv[(timestamps > self.high_water_mark.strftime(TIME_FORMAT)).values]
+                else:
+                    new_rows = df_ohlcv
+                if not new_rows.empty:
+                    write_header = not os.path.exists(self.sol_ohlcv_file)
+                    new_rows.to_csv(self.sol_ohlcv_file, mode='a', header=write_header, index=False)
+                
+                latest = datetime.strptime(timestamps.max(), TIME_FORMAT)
+                self.high_water_mark = max(latest, self.high_water_mark or latest)
+                logger.info(f"Updated SOL/FAFO data with {len(new_rows)} new records")
                 logger.info(f"Latest data:\n{df_ohlcv.tail(1)}")
             else:
                 logger.warning("No SOL/FAFO data available")
@@ -70,6 +180,7 @@ class DataCollector:
                 time.sleep(interval_seconds)
             except KeyboardInterrupt:
                 logger.info("Data collection stopped by user")
+                self.store.close()
                 break
             except Exception as e:
                 logger.error(f"Error in collection loop: {str(e)}")
@@ -2,8 +2,9 @@ import os
 import pandas as pd
 from datetime import datetime, timedelta
 import logging
-from BITQUERY_API import BitqueryClient
-import time
+from BITQUERY_API import BitqueryClient, build_ohlcv_payload, parse_ohlcv_response, response_error
+from async_fetcher import CsvSink
+from backfill_planner import BackfillProgress, ProgressSink, plan_backfill
 
 # Set up logging
 logging.basicConfig(
@@ -12,11 +13,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def fetch_seconds_data(days_to_fetch=7):
+def fetch_seconds_data(days_to_fetch=7, progress_db='minute_data/backfill_progress.db'):
     """
     Fetch minute-by-minute historical data for the past specified days
     Args:
         days_to_fetch (int): Number of days of historical data to fetch
+        progress_db (str): SQLite file recording finished day windows
     """
     client = BitqueryClient()
     output_dir = 'minute_data'
@@ -26,45 +28,54 @@ def fetch_seconds_data(days_to_fetch=7):
     SOL_ADDRESS = "So11111111111111111111111111111111111111112"
     FAFO_ADDRESS = "BP8RUdhLKBL2vgVXc3n7oTSZKWaQVbD8S6QcPaMVBAPo"
     
-    all_data = []
+    # Disjoint day windows, skipping the ones finished by an earlier run
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    progress = BackfillProgress(progress_db)
+    jobs = plan_backfill(progress, [(SOL_ADDRESS, "SOL/FAFO")], FAFO_ADDRESS, "1m",
+                         now - timedelta(days=days_to_fetch), now)
+    logger.info(f"{len(jobs)} day windows to fetch")
     
-    # Fetch data day by day to avoid overwhelming the API
-    for day in range(days_to_fetch):
-        try:
-            logger.info(f"Fetching day {day + 1} of {days_to_fetch}...")
+    filename = f'sol_fafo_1m_{days_to_fetch}days.csv'
+    sink = ProgressSink(CsvSink(output_dir, filename=filename, append=True), progress, now=now)
+    
+    failed = []
+    try:
+        for job in jobs:
+            logger.info(f"Fetching {job.since} to {job.till}...")
+            payload = build_ohlcv_payload(job.token_address, job.base_address, job.interval,
+                                          since=job.since, till=job.till)
+            try:
+                response_data = client.post_query(payload)
+            except Exception as e:
+                logger.error(f"Error fetching {job.since} to {job.till}: {e}")
+                failed.append(job)
+                continue
             
-            df = client.fetch_ohlcv_data(
-                SOL_ADDRESS,
-                FAFO_ADDRESS,
-                symbol="SOL/FAFO",
-                interval="1m",  # 1-minute intervals
-                days_ago=day
-            )
+            # Failed queries stay out of the sink, so their windows are not recorded as done
+            error = response_error(response_data)
+            if error:
+                logger.error(f"{job.since} to {job.till}: {error}")
+                failed.append(job)
+                continue
             
-            if df is not None and not df.empty:
-                all_data.append(df)
-                logger.info(f"Fetched {len(df)} records for day -{day}")
-                logger.info(f"Date range: {df['timestamp'].min()} to {df['timestamp'].max()}")
-                logger.info(f"Sample data:\n{df.head()}\n")
-                
-                # Sleep to avoid rate limiting
-                time.sleep(2)
+            df = parse_ohlcv_response(response_data, job.symbol)
+            sink(job, df)
+            if df.empty:
+                logger.warning(f"No trades for {job.since} to {job.till}")
             else:
-                logger.warning(f"No data available for day -{day}")
-                
-        except Exception as e:
-            logger.error(f"Error fetching data for day -{day}: {str(e)}")
-            continue
+                logger.info(f"Fetched {len(df)} records for {job.since.date()}")
+    finally:
+        progress.close()
+        client.close()
+    logger.info(f"{len(sink.stored)} windows stored, {len(sink.empty)} valid but empty, "
+                f"{len(failed)} failed and left for the next run")
     
-    if all_data:
-        # Combine all data
-        combined_df = pd.concat(all_data)
-        combined_df = combined_df.sort_values('timestamp')
-        combined_df = combined_df.drop_duplicates()
-        
-        # Save combined data
-        filename = f'sol_fafo_1m_{days_to_fetch}days.csv'
-        filepath = os.path.join(output_dir, filename)
+    filepath = os.path.join(output_dir, filename)
+    if os.path.exists(filepath):
+        # Sort and de-duplicate the combined file
+        combined_df = pd.read_csv(filepath)
+        # Keep the last copy of each bar: the refetched trailing window is fresher than last run's
+        combined_df = combined_df.drop_duplicates(subset='timestamp', keep='last').sort_values('timestamp')
         combined_df.to_csv(filepath, index=False)
         logger.info(f"Saved {len(combined_df)} total records to {filename}")
         logger.info(f"Full date range: {combined_df['timestamp'].min()} to {combined_df['timestamp'].max()}")
@@ -3,8 +3,9 @@ import pandas as pd
 import time
 
 class JupiterTokenFetcher:
-    def __init__(self):
-        self.base_url = "https://token.jup.ag/all"
+    def __init__(self, base_url="https://token.jup.ag/all"):
+        # base_url: token list endpoint; point it at the local stub server for tests
+        self.base_url = base_url
 
     def fetch_active_tokens(self):
         """
@@ -1,9 +1,13 @@
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import time
 from datetime import datetime, timedelta
 import os
+import sys
+import sqlite3
 import logging
+from token_registry import get_registry
 
 # Set up logging
 logging.basicConfig(
@@ -12,9 +16,45 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+SOL_ADDRESS = "So11111111111111111111111111111111111111112"
+
+# Largest number of comma-separated ids the price endpoint accepts per request
+MAX_IDS_PER_REQUEST = 100
+
+SNAPSHOT_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SNAPSHOT_COLUMNS = ['snapshot_at', 'address', 'symbol', 'price', 'vs_token', 'price_change_24h', 'volume_24h']
+
 class JupiterDirectAPI:
-    def __init__(self):
-        self.base_url = "https://price.jup.ag/v4"
+    def __init__(self, base_url="https://price.jup.ag/v4", batch_size=MAX_IDS_PER_REQUEST, timeout=10,
+                 vs_token=SOL_ADDRESS):
+        """
+        base_url: price API root; point it at a local stub for tests
+        batch_size: ids per request, capped at MAX_IDS_PER_REQUEST
+        timeout: seconds per request
+        """
+        self.base_url = base_url
+        self.batch_size = min(batch_size, MAX_IDS_PER_REQUEST)
+        self.timeout = timeout
+        self.vs_token = vs_token
+        
+        # Reused across requests and polls, so connections stay open
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def close(self):
+        self.session.close()
+    
+    def _request_prices(self, addresses):
+        response = self.session.get(
+            f"{self.base_url}/price",
+            params={'ids': ','.join(addresses), 'vsToken': self.vs_token},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json().get('data') or {}
     
     def get_token_price(self, token_address, symbol):
         """
@@ -23,91 +63,127 @@ class JupiterDirectAPI:
             token_address: Token mint address
             symbol: Token symbol for logging
         """
-        try:
-            url = f"{self.base_url}/price?ids={token_address}&vsToken=So11111111111111111111111111111111111111112"
-            
-            logger.info(f"Fetching price for {symbol} ({token_address})")
-            logger.info(f"URL: {url}")
-            
-            response = requests.get(url)
-            logger.info(f"Response status: {response.status_code}")
-            logger.info(f"Response text: {response.text}")
-            
-            response.raise_for_status()
-            data = response.json()
-            
-            if 'data' not in data or token_address not in data['data']:
-                logger.warning(f"No price data found for {symbol} ({token_address})")
-                return None
-            
-            token_data = data['data'][token_address]
-            
-            # Create DataFrame with price data
-            price_data = {
-                'timestamp': datetime.fromtimestamp(token_data['timestamp'] / 1000),
-                'price': float(token_data['price']),
-                'price_change_24h': float(token_data.get('priceChange24h', 0)),
-                'volume_24h': float(token_data.get('volume24h', 0))
-            }
-            
-            df = pd.DataFrame([price_data])
-            logger.info(f"Successfully got price data for {symbol}: {df.head()}")
-            return df
-            
-        except Exception as e:
-            logger.error(f"Error fetching price for {symbol} ({token_address}): {str(e)}")
-            logger.error("Full error: ", exc_info=True)
+        df = self.get_prices([token_address], {token_address: symbol})
+        if df.empty:
+            logger.warning(f"No price data found for {symbol} ({token_address})")
             return None
+        df = df.rename(columns={'snapshot_at': 'timestamp'})
+        return df[['timestamp', 'price', 'price_change_24h', 'volume_24h']]
+    
+    def get_prices(self, addresses, symbols=None):
+        """
+        Prices for many tokens in as few requests as the batch size allows
+
+        addresses: token mint addresses
+        symbols: optional {address: symbol}, otherwise the symbol Jupiter reports
+        Returns one snapshot DataFrame with SNAPSHOT_COLUMNS; tokens without a
+        price are left out and failed chunks are logged and skipped. snapshot_at
+        is the quote time Jupiter reports (UTC), or the poll time when a quote
+        carries no timestamp.
+        """
+        symbols = symbols or {}
+        polled_at = datetime.utcnow().strftime(SNAPSHOT_FORMAT)
+        columns = {name: [] for name in SNAPSHOT_COLUMNS}
+        
+        for start in range(0, len(addresses), self.batch_size):
+            chunk = addresses[start:start + self.batch_size]
+            try:
+                data = self._request_prices(chunk)
+            except Exception as e:
+                logger.error(f"Error fetching prices for {len(chunk)} tokens starting at {chunk[0]}: {str(e)}")
+                continue
+            
+            for address in chunk:
+                token_data = data.get(address)
+                if not token_data or token_data.get('price') is None:
+                    continue
+                if token_data.get('timestamp') is not None:
+                    snapshot_at = datetime.utcfromtimestamp(token_data['timestamp'] / 1000).strftime(SNAPSHOT_FORMAT)
+                else:
+                    snapshot_at = polled_at
+                columns['snapshot_at'].append(snapshot_at)
+                columns['address'].append(address)
+                columns['symbol'].append(symbols.get(address) or token_data.get('mintSymbol'))
+                columns['price'].append(float(token_data['price']))
+                columns['vs_token'].append(token_data.get('vsToken', self.vs_token))
+                columns['price_change_24h'].append(float(token_data.get('priceChange24h', 0)))
+                columns['volume_24h'].append(float(token_data.get('volume24h', 0)))
+        
+        return pd.DataFrame(columns)
+
+class PriceSnapshotStore:
+    def __init__(self, db_path):
+        """
+        Every poll's prices in one table, one row per (snapshot_at, address)
+
+        A quote Jupiter has not refreshed since the last poll keeps its
+        snapshot_at, so polling it again replaces the row instead of adding one.
+        """
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS price_snapshots (
+            snapshot_at TEXT NOT NULL,
+            address TEXT NOT NULL,
+            symbol TEXT,
+            price REAL,
+            vs_token TEXT,
+            price_change_24h REAL,
+            volume_24h REAL,
+            PRIMARY KEY (snapshot_at, address)
+        )
+        ''')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_price_snapshots_address ON price_snapshots (address, snapshot_at)'
+        )
+        self.conn.commit()
+    
+    def write(self, df):
+        """Insert one snapshot in a single transaction"""
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO price_snapshots ({', '.join(SNAPSHOT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(SNAPSHOT_COLUMNS))})",
+            df[SNAPSHOT_COLUMNS].itertuples(index=False, name=None)
+        )
+        self.conn.commit()
+    
+    def close(self):
+        self.conn.close()
 
 def main():
+    # Usage: python jupiter_direct_api.py [poll_seconds]
+    poll_seconds = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    
     # Load tokens from jupiter.csv
-    try:
-        df = pd.read_csv('jupiter.csv')
-        logger.info(f"Loaded {len(df)} tokens from jupiter.csv")
-        
-        # Display first few tokens for debugging
-        logger.info(f"First few tokens:\n{df.head()}")
-    except FileNotFoundError:
+    registry = get_registry(['jupiter.csv'])
+    if not len(registry):
         logger.error("jupiter.csv not found")
         return
+    logger.info(f"Loaded {len(registry)} tokens from jupiter.csv")
     
-    client = JupiterDirectAPI()
+    addresses = [token.address for token in registry]
+    symbols = {token.address: token.symbol for token in registry}
     
-    # Create directory for price data if it doesn't exist
+    client = JupiterDirectAPI()
     os.makedirs('price_data', exist_ok=True)
+    store = PriceSnapshotStore('price_data/price_snapshots.db')
     
-    # Try with just the first token first for testing
-    first_token = df.iloc[0]
-    symbol = first_token['symbol']
-    token_address = first_token['address']
-    
-    logger.info(f"Testing with first token: {symbol} ({token_address})")
-    price_data = client.get_token_price(token_address, symbol)
-    
-    if price_data is not None and not price_data.empty:
-        filename = f"price_data/{symbol}_price.csv"
-        price_data.to_csv(filename, index=False)
-        logger.info(f"Saved data for {symbol} to {filename}")
-        
-        # If successful with first token, process the rest
-        for _, row in df.iloc[1:].iterrows():
-            symbol = row['symbol']
-            token_address = row['address']
-            
-            logger.info(f"Processing {symbol} ({token_address})...")
-            price_data = client.get_token_price(token_address, symbol)
-            
-            if price_data is not None and not price_data.empty:
-                filename = f"price_data/{symbol}_price.csv"
-                price_data.to_csv(filename, index=False)
-                logger.info(f"Saved data for {symbol} to {filename}")
-            else:
-                logger.warning(f"No data available for {symbol}")
-            
-            # Add delay to respect rate limits
-            time.sleep(0.5)
-    else:
-        logger.error(f"Failed to get data for first token {symbol}. Please check API access.")
+    try:
+        while True:
+            start = time.perf_counter()
+            snapshot = client.get_prices(addresses, symbols)
+            store.write(snapshot)
+            logger.info(
+                f"Stored {len(snapshot)}/{len(addresses)} prices in "
+                f"{-(-len(addresses) // client.batch_size)} requests, {time.perf_counter() - start:.2f}s"
+            )
+            if poll_seconds is None:
+                break
+            time.sleep(max(0.0, poll_seconds - (time.perf_counter() - start)))
+    except KeyboardInterrupt:
+        logger.info("Price polling stopped by user")
+    finally:
+        store.close()
+        client.close()
 
 if __name__ == "__main__":
     main()
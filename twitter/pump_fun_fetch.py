@@ -6,7 +6,8 @@ from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
-api_url = "https://graphql.bitquery.io/"
+# BITQUERY_V1_URL points the script at the local stub server (stub_bitquery_server.py)
+api_url = os.getenv('BITQUERY_V1_URL', "https://graphql.bitquery.io/")
 api_key = os.getenv('API_2')
 api_token = os.getenv('TOKEN_2')
 
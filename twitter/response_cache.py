@@ -0,0 +1,111 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+class OfflineCacheMiss(Exception):
+    """Raised in offline mode when a query has never been cached"""
+
+
+def normalize_query(query):
+    """Collapse whitespace so formatting changes do not change the cache key"""
+    return ' '.join(query.split())
+
+
+def cache_key(payload):
+    """Content address of a GraphQL payload: sha256 of the normalized query and sorted variables"""
+    canonical = json.dumps(
+        {'query': normalize_query(payload['query']), 'variables': payload.get('variables', {})},
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _parse_time(value):
+    moment = datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+class ResponseCache:
+    def __init__(self, cache_dir, offline=False, recent_ttl=300, settle_seconds=3600):
+        """
+        On-disk cache of Bitquery responses, one gzipped JSON file per query
+
+        cache_dir: root directory; files live under <first two hex chars>/<key>.json.gz
+        offline: serve only from the cache, ignoring TTLs, and raise OfflineCacheMiss
+                 instead of going to the network
+        recent_ttl: seconds a response stays fresh when its window reaches "now"
+        settle_seconds: how long after a window closes before its trades are treated as final
+        """
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.recent_ttl = recent_ttl
+        self.settle_seconds = settle_seconds
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured by BITQUERY_CACHE_DIR and BITQUERY_OFFLINE=1, or None when unset"""
+        cache_dir = os.getenv('BITQUERY_CACHE_DIR')
+        if not cache_dir:
+            return None
+        return cls(cache_dir, offline=os.getenv('BITQUERY_OFFLINE') == '1')
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.json.gz')
+
+    def ttl(self, payload, now=None):
+        """None (never expires) for a window closed before now - settle_seconds, else recent_ttl"""
+        till = payload.get('variables', {}).get('till')
+        now = now or time.time()
+        if till and _parse_time(till) <= now - self.settle_seconds:
+            return None
+        return self.recent_ttl
+
+    def get(self, payload):
+        """Cached response for payload, or None if missing or expired (offline: raise on miss)"""
+        path = self.path(cache_key(payload))
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+
+        if entry is not None and (
+            self.offline or entry['expires_at'] is None or entry['expires_at'] > time.time()
+        ):
+            self.hits += 1
+            return entry['response']
+
+        self.misses += 1
+        if self.offline:
+            raise OfflineCacheMiss(f"No cached response for {payload.get('variables')}")
+        return None
+
+    def put(self, payload, response):
+        """Store a successful response; GraphQL errors and empty bodies are not cached"""
+        if not isinstance(response, dict) or response.get('errors') or not response.get('data'):
+            return
+        ttl = self.ttl(payload)
+        now = time.time()
+        entry = {
+            'stored_at': now,
+            'expires_at': None if ttl is None else now + ttl,
+            'variables': payload.get('variables', {}),
+            'response': response
+        }
+        path = self.path(cache_key(payload))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
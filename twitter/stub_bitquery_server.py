@@ -0,0 +1,436 @@
+import os
+import gzip
+import json
+import sys
+import math
+import time
+import random
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from response_cache import cache_key
+
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+EPOCH = datetime(1970, 1, 1)
+WSOL = {'Symbol': 'WSOL', 'SmartContract': "So11111111111111111111111111111111111111112"}
+
+ERROR_STATUSES = (500, 502, 503)
+
+
+def synthesize_bars(num_bars, interval_seconds=60, after=None, before=None, token=None, trades=False):
+    """
+    DEXTradeByTokens rows shaped like the Bitquery OHLCV response
+
+    Bars sit on the interval grid strictly after `after` and before `before`
+    (default: from 2024-01-01 on), at most num_bars of them. Values depend only
+    on the token and bar time, so overlapping queries agree.
+    trades: add the trade count column of the EVM DEXTrades query
+    """
+    step = timedelta(seconds=interval_seconds)
+    if after is None:
+        start = datetime(2024, 1, 1)
+    else:
+        start = after - (after - EPOCH) % step + step
+    # Each token trades around its own price level
+    level = random.Random(token).uniform(1e-4, 10.0) if token else 1.0
+    bars = []
+    moment = start
+    while len(bars) < num_bars and (before is None or moment < before):
+        seconds = int((moment - EPOCH).total_seconds())
+        rng = random.Random(f"{token}:{seconds}" if token else seconds)
+        price = level * (1.0 + 0.1 * math.sin(seconds / 86400) + rng.gauss(0, 0.005))
+        bar = {
+            'Block': {'Time': moment.strftime(TIME_FORMAT)},
+            'min': price * 0.99,
+            'max': price * 1.01,
+            'close': price,
+            'open': price,
+            'volume': rng.uniform(100, 10000)
+        }
+        if trades:
+            bar['trades'] = rng.randint(1, 500)
+        bars.append(bar)
+        moment += step
+    return bars
+
+
+def synthetic_address(seed):
+    """Stable 44-character stand-in for a mint or contract address"""
+    return hashlib.sha256(str(seed).encode('utf-8')).hexdigest()[:44]
+
+
+def synthesize_pairs(num_pairs, offset=0, limit=1000):
+    """EVM DEXTrades rows for the pair listing, one per pair, most traded first"""
+    rows = []
+    for i in range(offset, min(offset + limit, num_pairs)):
+        rows.append({
+            'Trade': {
+                'Currency': {'Symbol': f"TKN{i}", 'SmartContract': synthetic_address(f"pair{i}")},
+                'Side': {'Currency': dict(WSOL)}
+            },
+            'Block': {'Time': datetime(2024, 1, 1).strftime(TIME_FORMAT)},
+            'volume': float(num_pairs - i)
+        })
+    return rows
+
+
+def synthesize_transactions(count):
+    """Rows of the v1 solana.transactions query used by pump_fun_fetch.py"""
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        rng = random.Random(i)
+        rows.append({
+            'block': {'timestamp': {'time': (now - timedelta(seconds=i)).strftime('%Y-%m-%d %H:%M:%S')}},
+            'success': True,
+            'transactionFee': rng.uniform(5e-6, 1e-4),
+            'signature': synthetic_address(f"tx{i}") * 2,
+            'feePayer': synthetic_address(f"payer{i}"),
+            'accountsCount': rng.randint(2, 30)
+        })
+    return rows
+
+
+def synthesize_price(address, vs_token):
+    """Jupiter /price entry for one id; the price depends only on the id, so repeated polls agree"""
+    rng = random.Random(address)
+    return {
+        'id': address,
+        'mintSymbol': address[:4].upper(),
+        'vsToken': vs_token,
+        'vsTokenSymbol': 'SOL',
+        'price': rng.uniform(1e-6, 10.0),
+        'timestamp': int(time.time() * 1000)
+    }
+
+
+def synthesize_token_list(count):
+    """Jupiter token list (token.jup.ag/all) entries"""
+    return [
+        {'address': synthetic_address(f"token{i}"), 'symbol': f"TKN{i}", 'name': f"Token {i}", 'decimals': 9}
+        for i in range(count)
+    ]
+
+
+def _parse_time(value):
+    return datetime.strptime(value, TIME_FORMAT) if value else None
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real endpoint
+    # Headers and body go out as separate writes; without TCP_NODELAY a kept-alive
+    # socket stalls on delayed ACKs and hides the real client cost
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        if self.server.handshake_latency:
+            # Stand-in for the TCP + TLS round trips a new connection to the real endpoint costs
+            time.sleep(self.server.handshake_latency)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        payload = json.loads(body or b'{}')
+        with self.server.lock:
+            self.server.requests += 1
+        if self._inject_fault():
+            return
+
+        use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        data = self.server.replay(payload, use_gzip)
+        if data is None:
+            if self.server.replay_only:
+                self._send_json(404, {'errors': [{'message': 'No recorded response for this query'}]})
+                return
+            data = self.server.body(payload, use_gzip)
+        if data is None:
+            self._send_json(400, {'errors': [{'message': 'Query not supported by the stub'}]})
+            return
+        self._send(200, data, use_gzip)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        with self.server.lock:
+            self.server.requests += 1
+
+        if url.path.endswith('/price'):
+            # Jupiter price API: GET /price?ids=a,b,c&vsToken=...
+            ids = [i for i in query.get('ids', [''])[0].split(',') if i]
+            with self.server.lock:
+                self.server.price_ids += len(ids)
+            if not ids or len(ids) > self.server.max_ids:
+                self._send_json(400, {'error': f"Expected 1-{self.server.max_ids} ids"})
+                return
+            if self._inject_fault():
+                return
+            vs_token = query.get('vsToken', [''])[0]
+            # Ids starting with "unknown" have no price, and are left out like unlisted mints
+            data = {i: synthesize_price(i, vs_token) for i in ids if not i.startswith('unknown')}
+            self._send_json(200, {'data': data, 'timeTaken': self.server.latency})
+        elif url.path.endswith('/all'):
+            # Jupiter token list
+            if self._inject_fault():
+                return
+            self._send_json(200, synthesize_token_list(self.server.num_tokens))
+        else:
+            self._send_json(404, {'error': f"Unknown path {url.path}"})
+
+    def _inject_fault(self):
+        """Send a 429, HTTP error or GraphQL error if the fault settings call for one, else sleep the latency"""
+        if not self.server.admit():
+            with self.server.lock:
+                self.server.throttled += 1
+            self.send_response(429)
+            self.send_header('Retry-After', str(self.server.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return True
+
+        with self.server.lock:
+            roll = self.server.rng.random()
+            status = self.server.rng.choice(ERROR_STATUSES)
+            delay = self.server.latency + self.server.rng.uniform(0, self.server.jitter)
+        if roll < self.server.error_rate:
+            with self.server.lock:
+                self.server.errors += 1
+            self._send_json(status, {'errors': [{'message': 'Injected server error'}]})
+            return True
+
+        if delay:
+            time.sleep(delay)
+        if roll < self.server.error_rate + self.server.graphql_error_rate:
+            with self.server.lock:
+                self.server.errors += 1
+            # Bitquery reports query failures as 200 with an errors list
+            self._send_json(200, {'errors': [{'message': 'Injected GraphQL error'}]})
+            return True
+        return False
+
+    def _send_json(self, status, obj):
+        self._send(status, json.dumps(obj).encode('utf-8'), False)
+
+    def _send(self, status, data, use_gzip):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 resets connections when a concurrent client opens its pool at once
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # Clients cancelled mid-response (shutdown, timeouts) are expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def admit(self):
+        """Server-side token bucket: False once requests exceed quota per second"""
+        if not self.quota:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(self.quota, self.allowance + (now - self.last_check) * self.quota)
+            self.last_check = now
+            if self.allowance < 1:
+                return False
+            self.allowance -= 1
+            return True
+
+    def replay(self, payload, use_gzip):
+        """Recorded response for payload from a ResponseCache directory, ignoring its TTLs"""
+        if not self.replay_dir or 'query' not in payload:
+            return None
+        key = cache_key(payload)
+        path = os.path.join(self.replay_dir, key[:2], key + '.json.gz')
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                response = json.load(f)['response']
+        except (OSError, ValueError, KeyError):
+            return None
+        with self.lock:
+            self.replayed += 1
+        data = json.dumps(response).encode('utf-8')
+        return gzip.compress(data) if use_gzip else data
+
+    def synthesize(self, query, variables):
+        """Response for a GraphQL query, chosen by the shape of the query; None if unsupported"""
+        if 'DEXTradeByTokens' in query:
+            bars = synthesize_bars(
+                self.bars, variables.get('interval', 60),
+                _parse_time(variables.get('time_ago')),
+                _parse_time(variables.get('till')) or datetime.utcnow(),
+                token=variables.get('token')
+            )
+            return {'data': {'Solana': {'DEXTradeByTokens': bars}}}
+        if 'DEXTrades' in query and 'base' in variables:
+            bars = synthesize_bars(self.bars, variables.get('interval', 60),
+                                   _parse_time(variables.get('since')), _parse_time(variables.get('till')),
+                                   token=variables['base'], trades=True)
+            return {'data': {'EVM': {'DEXTrades': bars}}}
+        if 'DEXTrades' in query:
+            rows = synthesize_pairs(self.num_pairs, variables.get('offset', 0), variables.get('limit', 1000))
+            return {'data': {'EVM': {'DEXTrades': rows}}}
+        if 'transactions' in query:
+            return {'data': {'solana': {'transactions': synthesize_transactions(50)}}}
+        return None
+
+    def body(self, payload, use_gzip):
+        """Encoded response for a query, built once so the stub's own CPU stays out of client timings"""
+        query, variables = payload.get('query', ''), payload.get('variables') or {}
+        key = (cache_key({'query': query, 'variables': variables}), use_gzip)
+        data = self.bodies.get(key)
+        if data is None:
+            # Built outside the lock so concurrent cold queries do not queue behind each other
+            response = self.synthesize(query, variables)
+            if response is None:
+                return None
+            data = json.dumps(response).encode('utf-8')
+            data = gzip.compress(data) if use_gzip else data
+            with self.lock:
+                data = self.bodies.setdefault(key, data)
+        return data
+
+
+class StubBitqueryServer:
+    def __init__(self, bars=500, latency=0.0, handshake_latency=0.0, quota=None, port=0, max_ids=100,
+                 jitter=0.0, error_rate=0.0, graphql_error_rate=0.0, retry_after=1, replay_dir=None,
+                 replay_only=False, num_pairs=2500, num_tokens=1000, seed=0):
+        """
+        Local stand-in for the Bitquery and Jupiter APIs, run in a background thread
+
+        GraphQL POSTs (any path) get synthetic answers for the Solana OHLCV query,
+        the EVM DEXTrades pair listing (paged by $limit/$offset) and per-pair OHLCV,
+        and the v1 solana.transactions query. GETs serve Jupiter's /price (400 above
+        max_ids ids) and /all token list.
+
+        bars: rows returned per OHLCV query
+        latency / jitter: seconds slept before each response, plus up to jitter more
+        handshake_latency: seconds slept when a new connection is accepted
+        quota: requests per second before answering 429 with Retry-After; None for unlimited
+        error_rate: fraction of requests answered with a 500, 502 or 503
+        graphql_error_rate: fraction answered 200 with a GraphQL errors list
+        replay_dir: ResponseCache directory (BITQUERY_CACHE_DIR of a real run) whose
+                    recorded responses are served for matching queries
+        replay_only: 404 queries with no recording instead of synthesizing them
+        seed: seeds the fault injection, so runs see the same error pattern
+        Counts requests, TCP connections and injected faults so tests can check them.
+        """
+        self.httpd = _StubHTTPServer(('127.0.0.1', port), _StubHandler)
+        self.httpd.bars = bars
+        self.httpd.bodies = {}
+        self.httpd.latency = latency
+        self.httpd.jitter = jitter
+        self.httpd.handshake_latency = handshake_latency
+        self.httpd.quota = quota
+        self.httpd.allowance = quota or 0
+        self.httpd.last_check = time.monotonic()
+        self.httpd.retry_after = retry_after
+        self.httpd.error_rate = error_rate
+        self.httpd.graphql_error_rate = graphql_error_rate
+        self.httpd.rng = random.Random(seed)
+        self.httpd.replay_dir = replay_dir
+        self.httpd.replay_only = replay_only
+        self.httpd.num_pairs = num_pairs
+        self.httpd.num_tokens = num_tokens
+        self.httpd.max_ids = max_ids
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = 0
+        self.httpd.connections = 0
+        self.httpd.throttled = 0
+        self.httpd.errors = 0
+        self.httpd.replayed = 0
+        self.httpd.price_ids = 0
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self):
+        return f"{self.base_url}/eap"
+
+    @property
+    def price_url(self):
+        return f"{self.base_url}/v4"
+
+    @property
+    def token_list_url(self):
+        return f"{self.base_url}/all"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    @property
+    def connections(self):
+        return self.httpd.connections
+
+    @property
+    def throttled(self):
+        return self.httpd.throttled
+
+    @property
+    def errors(self):
+        return self.httpd.errors
+
+    @property
+    def replayed(self):
+        return self.httpd.replayed
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    # Usage: python stub_bitquery_server.py [port] [latency_ms] [quota] [error_rate] [replay_dir]
+    args = sys.argv[1:]
+    port = int(args[0]) if len(args) > 0 else 8080
+    latency = float(args[1]) / 1000 if len(args) > 1 else 0.0
+    quota = float(args[2]) if len(args) > 2 and float(args[2]) > 0 else None
+    error_rate = float(args[3]) if len(args) > 3 else 0.0
+    replay_dir = args[4] if len(args) > 4 else None
+
+    server = StubBitqueryServer(latency=latency, quota=quota, error_rate=error_rate,
+                                replay_dir=replay_dir, port=port)
+    print(f"Serving Bitquery at {server.url}, Jupiter at {server.price_url} and {server.token_list_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"{server.requests} requests, {server.throttled} throttled, {server.errors} errors, "
+              f"{server.replayed} replayed")
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import os
+import json
+import hashlib
+import logging
+from collections import namedtuple
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+Token = namedtuple('Token', ['address', 'symbol', 'name'])
+
+DEFAULT_PATHS = ('active_tokens.csv', 'jupiter.csv')
+
+# Column names used by the token list files, mapped to address/symbol/name
+TOKEN_FILE_COLUMNS = {
+    'active_tokens.csv': {'MintAddress': 'address', 'Symbol': 'symbol', 'Name': 'name'},
+    'jupiter.csv': {}
+}
+
+# Stablecoins, majors and wrapped/staked/bridged variants, which carry no meme sentiment
+EXCLUDED_SYMBOLS = {'USDC', 'USDT', 'PYUSD', 'USN', 'DAI', 'WBTC', 'ETH', 'BTC', 'SUSHI', 'ALEPH'}
+EXCLUDED_PREFIXES = ('so', 'w', 'st', 'x', 'ms', 'bs', 'hs', 'stake', 'wrapped')
+WRAPPED_NAME_KEYWORDS = ('wrapped', 'synthetic', 'sollet', 'wormhole')
+
+CACHE_VERSION = 1
+
+
+def is_excluded(token):
+    """True for stablecoins and wrapped or synthetic tokens"""
+    symbol = token.symbol.strip()
+    if symbol.upper() in EXCLUDED_SYMBOLS or symbol.lower().startswith(EXCLUDED_PREFIXES):
+        return True
+    name = token.name.lower()
+    return any(keyword in name for keyword in WRAPPED_NAME_KEYWORDS)
+
+
+def _source_signature(paths):
+    """(path, mtime, size) of every existing source; any change invalidates the cache"""
+    signature = []
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            signature.append([os.path.abspath(path), stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def _read_tokens(paths):
+    """Tokens from every CSV in order, the first file listing an address wins"""
+    tokens = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        df = df.rename(columns=TOKEN_FILE_COLUMNS.get(os.path.basename(path), {}))
+        if 'name' not in df.columns:
+            df['name'] = df['symbol']
+        df = df[df['address'].str.strip() != '']
+        for address, symbol, name in zip(df['address'].str.strip(), df['symbol'].str.strip(), df['name'].str.strip()):
+            if address not in tokens:
+                tokens[address] = Token(address, symbol, name)
+        logger.info(f"Read tokens from {path}, {len(tokens)} so far")
+    return list(tokens.values())
+
+
+class TokenRegistry:
+    def __init__(self, tokens):
+        """
+        Token universe indexed by mint address, symbol and lowercase alias
+
+        Symbols are not unique across the lists; the first token registered under
+        a symbol or alias keeps it, so earlier files take precedence.
+        """
+        self.tokens = list(tokens)
+        self.by_address = {}
+        self.by_symbol = {}
+        self.by_alias = {}
+        for token in self.tokens:
+            self.by_address.setdefault(token.address, token)
+            self.by_symbol.setdefault(token.symbol.upper(), token)
+            for alias in (token.symbol.lower(), token.name.lower()):
+                if alias:
+                    self.by_alias.setdefault(alias, token)
+        self._tradable = None
+
+    @classmethod
+    def load(cls, paths=DEFAULT_PATHS, cache_path=None):
+        """
+        Registry for the given token CSVs, parsed once and cached on disk
+
+        cache_path: JSON file holding the parsed tokens; defaults to a file next to
+                    the first source, named after the source list. Rebuilt whenever
+                    a source's mtime or size changes. False disables the cache.
+        """
+        paths = list(paths)
+        signature = _source_signature(paths)
+        if cache_path is None:
+            digest = hashlib.sha1('\0'.join(os.path.abspath(p) for p in paths).encode('utf-8')).hexdigest()[:12]
+            cache_path = os.path.join(os.path.dirname(os.path.abspath(paths[0])), f'.token_registry.{digest}.json')
+
+        if cache_path:
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                if cached['version'] == CACHE_VERSION and cached['sources'] == signature:
+                    return cls(Token(*row) for row in cached['tokens'])
+            except (OSError, ValueError, KeyError):
+                pass
+
+        tokens = _read_tokens(paths)
+        if cache_path and signature:
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'version': CACHE_VERSION, 'sources': signature, 'tokens': tokens},
+                              f, separators=(',', ':'))
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                logger.warning(f"Could not write token registry cache {cache_path}: {e}")
+        return cls(tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __contains__(self, address):
+        return address in self.by_address
+
+    def get(self, address):
+        return self.by_address.get(address)
+
+    def symbol(self, symbol):
+        """Token for a ticker, ignoring case and a leading $"""
+        return self.by_symbol.get(symbol.lstrip('$').upper())
+
+    def lookup(self, key):
+        """Token for a mint address, ticker or name, case-insensitively for the latter two"""
+        token = self.by_address.get(key)
+        if token is None:
+            token = self.by_alias.get(key.lstrip('$').lower())
+        return token
+
+    def tradable(self):
+        """Tokens left after dropping stablecoins and wrapped/synthetic tokens"""
+        if self._tradable is None:
+            self._tradable = [token for token in self.tokens if not is_excluded(token)]
+        return self._tradable
+
+
+_registries = {}
+
+
+def get_registry(paths=DEFAULT_PATHS):
+    """Process-wide registry for paths, loaded on first use"""
+    key = tuple(os.path.abspath(path) for path in paths)
+    if key not in _registries:
+        _registries[key] = TokenRegistry.load(paths)
+    return _registries[key]
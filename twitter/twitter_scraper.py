@@ -16,6 +16,10 @@ import logging
 import time
 import random
 import traceback
+try:
+    from token_registry import get_registry
+except ImportError:  # imported as twitter.twitter_scraper from the repo root
+    from twitter.token_registry import get_registry
 
 # Set up logging
 logging.basicConfig(
@@ -550,50 +554,27 @@ def get_token_list():
     logger.info(f"Reading tokens from: {jupiter_path}")
     
     try:
-        # Read CSV with string type for symbol and name columns
-        df = pd.read_csv(jupiter_path, dtype={'symbol': str, 'name': str})
-        logger.info(f"Found {len(df)} tokens in jupiter.csv")
+        registry = get_registry([jupiter_path])
+        logger.info(f"Found {len(registry)} tokens in jupiter.csv")
         
         # Start with SOL
-        sol_row = df[df['symbol'].str.upper() == 'SOL'].iloc[0]
+        sol = registry.symbol('SOL')
         tokens.append({
             'name': 'sol',
             'query': '$SOL',
-            'address': sol_row['address']
+            'address': sol.address
         })
         logger.info("Added SOL token")
         
         # Add other tokens (excluding stablecoins and wrapped tokens)
-        exclude_symbols = ['USDC', 'USDT', 'PYUSD', 'USN', 'DAI', 'WBTC', 'ETH', 'BTC', 'SUSHI', 'ALEPH']
-        exclude_prefixes = ['so', 'w', 'st', 'x', 'ms', 'bs', 'hs', 'stake', 'wrapped']
-        
-        for _, row in df.iterrows():
-            try:
-                symbol = str(row['symbol']).strip()
-                name = str(row['name']).strip()
-                
-                # Skip if it's in exclude list or starts with excluded prefixes
-                if (symbol.upper() in exclude_symbols or 
-                    any(symbol.lower().startswith(prefix) for prefix in exclude_prefixes)):
-                    logger.info(f"Skipping token: {symbol} ({name})")
-                    continue
-                    
-                # Skip if it's a wrapped or synthetic version
-                if any(keyword in name.lower() for keyword in ['wrapped', 'synthetic', 'sollet', 'wormhole']):
-                    logger.info(f"Skipping wrapped/synthetic token: {symbol} ({name})")
-                    continue
-                    
-                tokens.append({
-                    'name': symbol.lower(),
-                    'query': f'${symbol}',
-                    'address': row['address']
-                })
-                logger.info(f"Added token: {symbol} ({name})")
-                
-            except Exception as e:
-                logger.error(f"Error processing row: {row}")
-                logger.error(str(e))
-                continue
+        tradable = registry.tradable()
+        for token in tradable:
+            tokens.append({
+                'name': token.symbol.lower(),
+                'query': f'${token.symbol}',
+                'address': token.address
+            })
+        logger.info(f"Skipped {len(registry) - len(tradable)} stablecoin/wrapped/synthetic tokens")
             
         logger.info(f"Total tokens to track: {len(tokens)}")
         logger.info("Token list: " + ", ".join([t['query'] for t in tokens]))